@@ -0,0 +1,221 @@
+# backfill.py - Loads the historical USNI fleet tracker archive into the reports table
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+
+import scraper
+import usni_parser
+
+DEFAULT_MAX_PAGES = 50
+DEFAULT_WORKERS = 4
+# Requests per second allowed against any single host
+DEFAULT_RATE_PER_HOST = 2.0
+# Posts written (and checkpointed) per transaction
+BATCH_SIZE = 25
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1/rate seconds apart, across all worker threads."""
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HttpSource:
+    """Fetches pages from the live site through a pooled session and a per-host rate limit."""
+
+    def __init__(self, rate_per_host=DEFAULT_RATE_PER_HOST):
+        self.session = scraper.create_http_session()
+        self.limiter = HostRateLimiter(rate_per_host)
+
+    def get(self, url):
+        self.limiter.wait(urlparse(url).netloc)
+        response = self.session.get(url, timeout=scraper.REQUEST_TIMEOUT_SECONDS)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.text
+
+    def close(self):
+        self.session.close()
+
+
+class DirectorySource:
+    """
+    Serves pages from a directory of saved HTML, standing in for the site.
+    A URL maps to its path under the root: '/category/fleet-tracker/page/2' is read from
+    'category/fleet-tracker/page/2.html' or 'category/fleet-tracker/page/2/index.html'.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, url):
+        path = urlparse(url).path.strip('/')
+        candidates = [os.path.join(self.root, path, 'index.html')]
+        if path:
+            candidates.insert(0, os.path.join(self.root, path if path.endswith('.html') else path + '.html'))
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                with open(candidate, encoding='utf-8') as f:
+                    return f.read()
+        return None
+
+    def close(self):
+        pass
+
+
+def init_checkpoint(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+            url TEXT PRIMARY KEY, report_date TEXT, ship_count INTEGER, processed_at TEXT
+        )
+    ''')
+    conn.commit()
+
+
+def archive_page_url(category_url, page):
+    return category_url if page == 1 else f"{category_url.rstrip('/')}/page/{page}/"
+
+
+def collect_post_urls(source, category_url, max_pages):
+    """Walks the paginated archive until it runs out of pages or posts. Returns URLs newest first, without duplicates."""
+    post_urls = []
+    seen = set()
+    for page in range(1, max_pages + 1):
+        html = source.get(archive_page_url(category_url, page))
+        if not html:
+            break
+        page_urls = usni_parser.parse_latest_post_urls(html, scraper.PARSER_BACKEND)
+        if not page_urls:
+            break
+        for url in page_urls:
+            if url not in seen:
+                seen.add(url)
+                post_urls.append(url)
+        logger.info("Archive page %d: %d posts.", page, len(page_urls))
+    return post_urls
+
+
+def fetch_and_parse(source, url):
+    """
+    Returns (url, update_date, report_date, ships). ships is None when the page is missing or
+    has no readable content, update_date is None when the post carries no date and report_date
+    is None when its date can't be read.
+    """
+    html = source.get(url)
+    if not html:
+        return url, None, None, None
+    update_date, report_date, ships = usni_parser.parse_dated_post(html, scraper.PARSER_BACKEND)
+    return url, update_date, report_date, ships
+
+
+def write_batch(conn, batch):
+    """
+    Writes a batch of parsed posts and their checkpoint rows in one transaction.
+    Returns the number of new reports; ones already stored are ignored and not counted.
+    """
+    now = datetime.now().isoformat(timespec='seconds')
+    report_rows = []
+    checkpoint_rows = []
+    for url, report_date, ships in batch:
+        for ship in ships:
+            report_rows.append((ship['hull'], report_date, ship['name'], ship['class'],
+                                ship['status'], ship['locationReported'], url))
+        checkpoint_rows.append((url, report_date, len(ships), now))
+    with conn:
+        # rowcount leaves out the trigger's writes to latest_positions, unlike conn.total_changes
+        written = conn.executemany("INSERT OR IGNORE INTO reports (hull, report_date, name, class, status, locationReported, source_url) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?)", report_rows).rowcount
+        if written:
+            # Older posts can still be the latest report for a hull, so let the server rebuild
+            conn.execute("INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                         "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+        conn.executemany("INSERT OR REPLACE INTO backfill_checkpoint (url, report_date, ship_count, processed_at) "
+                         "VALUES (?, ?, ?, ?)", checkpoint_rows)
+    return written
+
+
+def backfill(source, category_url=scraper.USNI_CATEGORY_URL, max_pages=DEFAULT_MAX_PAGES,
+             workers=DEFAULT_WORKERS, database_file=scraper.DATABASE_FILE):
+    """
+    Fetches every archived post not yet in the checkpoint with a bounded worker pool and
+    loads the ships into the reports table. Safe to interrupt and re-run.
+    """
+    conn = sqlite3.connect(database_file, timeout=scraper.DB_TIMEOUT_SECONDS)
+    init_checkpoint(conn)
+    try:
+        post_urls = collect_post_urls(source, category_url, max_pages)
+        done = {row[0] for row in conn.execute("SELECT url FROM backfill_checkpoint")}
+        pending = [url for url in post_urls if url not in done]
+        logger.info("Found %d posts in the archive, %d not yet processed.", len(post_urls), len(pending))
+
+        total_reports = 0
+        batch = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch_and_parse, source, url) for url in pending]
+            for future in as_completed(futures):
+                # Failed, unreadable and undated posts are left out of the checkpoint so the next run retries them
+                try:
+                    url, update_date, report_date, ships = future.result()
+                except Exception as e:
+                    logger.warning("Failed to fetch a post: %s", e)
+                    continue
+                if ships is None:
+                    logger.warning("Could not read the fleet data in %s; will retry next run.", url)
+                    continue
+                if not update_date:
+                    logger.warning("Post %s has no date; will retry next run.", url)
+                    continue
+                if report_date is None:
+                    logger.warning("Could not read the date %r of post %s; will retry next run.", update_date, url)
+                    continue
+                batch.append((url, report_date, ships))
+                if len(batch) >= BATCH_SIZE:
+                    total_reports += write_batch(conn, batch)
+                    batch = []
+        if batch:
+            total_reports += write_batch(conn, batch)
+
+        logger.info("Backfill complete. Wrote %d new ship reports from %d posts.", total_reports, len(pending))
+        return total_reports
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill historical fleet tracker posts into fleet.db.")
+    parser.add_argument('--pages', type=int, default=DEFAULT_MAX_PAGES, help="maximum archive pages to walk")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="concurrent post fetches")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE_PER_HOST, help="requests per second per host")
+    parser.add_argument('--category-url', default=scraper.USNI_CATEGORY_URL)
+    parser.add_argument('--source-dir', help="read pages from a directory of saved HTML instead of the network")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    scraper.init_db()
+    source = DirectorySource(args.source_dir) if args.source_dir else HttpSource(args.rate)
+    try:
+        backfill(source, args.category_url, args.pages, args.workers)
+    finally:
+        source.close()
@@ -0,0 +1,190 @@
+# bench_parser.py - Parse throughput over saved USNI posts, checked against the original parser
+#
+# Usage: python bench/bench_parser.py [--seconds 2] [--fixtures bench/fixtures/usni]
+#
+# Every fixture is checked against the original parser below. Ships must come out the same; the
+# one intended difference is in paragraphs naming several ships, where the original gave each
+# ship the rest of the paragraph as its status and usni_parser stops at the next ship. There a
+# status may differ only by being a part of the original's.
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import usni_parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'usni')
+
+
+# --- REFERENCE: the parse stage exactly as scrape_and_update ran it before usni_parser ---
+def _legacy_get_class_from_hull(hull):
+    match = re.match(r'([A-Z]+)', hull)
+    if match:
+        prefix = match.group(1)
+        return usni_parser.HULL_TO_CLASS.get(prefix, 'Unknown')
+    return 'Unknown'
+
+def _legacy_clean_status_text(text):
+    text = text.strip()
+    phrases_to_remove = [ r',\s*according to ship spotters\.?$', r',\s*according to local media reports\.?$' ]
+    for phrase in phrases_to_remove:
+        text = re.sub(phrase, '', text, flags=re.IGNORECASE)
+    text = text.strip()
+    if text and not text.endswith(('.', '!', '?')):
+        text += '.'
+    if text:
+        text = text[0].upper() + text[1:]
+    return text
+
+def legacy_parse_post(html_content_post):
+    soup_post = BeautifulSoup(html_content_post, 'html.parser')
+    post_content = soup_post.find('div', class_='entry-content')
+    if not post_content:
+        post_content = soup_post.find('div', class_='td-post-content')
+    if not post_content:
+        return None, None
+
+    date_tag = soup_post.find('time', class_='entry-date')
+    update_date = date_tag.text.strip() if date_tag else datetime.now().strftime("%B %d, %Y")
+
+    ships = []
+    for p in post_content.find_all('p'):
+        text = p.get_text()
+        matches = re.finditer(r'(USS|HMS|JS|FS|HMAS)\s+([\w\s\'-]+?)\s+\(([\w\s-]+)\)', text)
+        for match in matches:
+            prefix, name, hull = match.groups()
+            raw_status = text[match.end():].strip().replace('•', '').strip()
+            if len(raw_status) > 10:
+                ships.append({
+                    'name': f"{prefix} {name.strip()}",
+                    'hull': hull.strip(),
+                    'class': _legacy_get_class_from_hull(hull.strip()),
+                    'status': _legacy_clean_status_text(raw_status),
+                    'locationReported': update_date
+                })
+    return update_date, ships
+
+
+def load_fixtures(fixtures_dir):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def _spans_ships(status):
+    """True when the original parser's status ran on into another ship's mention."""
+    return usni_parser.SHIP_PATTERN.search(status) is not None
+
+
+def _intended_difference(ship, reference):
+    """A status cut at the next ship, or shared with it, is still part of the original's text."""
+    if {**ship, 'status': reference['status']} != reference or not _spans_ships(reference['status']):
+        return False
+    status = ship['status'].rstrip('.').lower()
+    return bool(status) and status in reference['status'].lower()
+
+
+def compare_with_reference(html, backend):
+    """Returns the differences from the original parser that are not intended, as readable strings."""
+    reference_date, reference_ships = legacy_parse_post(html)
+    update_date, ships = usni_parser.parse_post(html, backend)
+    if reference_ships is None or ships is None:
+        return [] if reference_ships == ships else ["content div found by only one parser"]
+
+    problems = []
+    if update_date != reference_date:
+        problems.append(f"date {update_date!r} instead of {reference_date!r}")
+    reference_hulls = Counter(ship['hull'] for ship in reference_ships)
+    hulls = Counter(ship['hull'] for ship in ships)
+    problems.extend(f"{hull} missing" for hull in reference_hulls - hulls)
+    problems.extend(f"{hull} not in the original output" for hull in hulls - reference_hulls)
+    if not problems:
+        for ship, reference in zip(ships, reference_ships):
+            if ship != reference and not _intended_difference(ship, reference):
+                problems.append(f"{ship['hull']}: {ship['status']!r} instead of {reference['status']!r}")
+    return problems
+
+
+def check_equivalence(pages, backend):
+    """Returns {fixture name: problems} for the fixtures whose output differs from the reference parser."""
+    mismatches = {}
+    for name, html in pages.items():
+        problems = compare_with_reference(html, backend)
+        if problems:
+            mismatches[name] = problems
+    return mismatches
+
+
+def report(title, pages, results):
+    baseline = results[0][1]
+    print(f"\n{title} ({len(pages)} fixtures)")
+    for label, rate in results:
+        print(f"{label:<28} {rate:10.1f} posts/sec  {rate / baseline:5.2f}x")
+
+
+def measure(parse, pages, seconds):
+    """Parses the fixtures round-robin for roughly `seconds`. Returns posts per second."""
+    htmls = list(pages.values())
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for html in htmls:
+            parse(html)
+        count += len(htmls)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the USNI post parser.")
+    parser.add_argument('--seconds', type=float, default=2.0, help="time spent per measurement")
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="directory of saved post HTML")
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures)
+    if not pages:
+        sys.exit(f"No fixtures found in {args.fixtures}")
+    reference = {name: legacy_parse_post(html)[1] or [] for name, html in pages.items()}
+    multi_ship = {name for name, ships in reference.items() if any(_spans_ships(ship['status']) for ship in ships)}
+    print(f"{len(pages)} fixtures, {sum(len(ships) for ships in reference.values())} ships, "
+          f"{len(multi_ship)} with multi-ship paragraphs")
+
+    failed = False
+    backends = []
+    for backend in usni_parser.BACKENDS:
+        try:
+            mismatches = check_equivalence(pages, backend)
+        except Exception as e:
+            print(f"{backend}: unavailable ({e})")
+            continue
+        for name, problems in mismatches.items():
+            failed = True
+            print(f"{backend}: {name} differs from the original parser: {'; '.join(problems)}")
+        backends.append(backend)
+
+    # Measured separately: the multi-ship posts are where the original parser goes quadratic
+    groups = [('Single-ship paragraphs', {name: html for name, html in pages.items() if name not in multi_ship}),
+              ('Multi-ship paragraphs', {name: html for name, html in pages.items() if name in multi_ship})]
+    for title, group in groups:
+        if not group:
+            continue
+        results = [('legacy (html.parser)', measure(legacy_parse_post, group, args.seconds))]
+        for backend in backends:
+            results.append((f"usni_parser ({backend})",
+                            measure(lambda html: usni_parser.parse_post(html, backend), group, args.seconds)))
+        report(title, group, results)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# compare_results.py - Side-by-side view of bench/load_test.py results
+#
+# Usage: python bench/compare_results.py bench/results/BASELINE.json bench/results/CANDIDATE.json [...]
+#
+# The first file is the baseline; every other column shows its value and the change against it.
+
+import argparse
+import json
+import os
+
+# (label, path into the results document, True when higher is better)
+METRICS = [
+    ('throughput (req/s)', ('load', 'requests_per_second'), True),
+    ('p50 latency (ms)', ('load', 'latency_ms', 'p50'), False),
+    ('p95 latency (ms)', ('load', 'latency_ms', 'p95'), False),
+    ('p99 latency (ms)', ('load', 'latency_ms', 'p99'), False),
+    ('max latency (ms)', ('load', 'latency_ms', 'max'), False),
+    ('errors', ('load', 'errors'), False),
+    ('bytes per request', ('load', 'bytes_per_request'), False),
+    ('first request (s)', ('first_request_seconds',), False),
+    ('scrape (s)', ('pipeline', 'scrape_seconds'), False),
+    ('backfill (s)', ('pipeline', 'backfill_seconds'), False),
+    ('mean worker RSS (MB)', ('memory_mean_rss_mb',), False),
+    ('max worker peak RSS (MB)', ('memory_max_peak_rss_mb',), False),
+]
+
+
+def load_result(path):
+    with open(path) as f:
+        result = json.load(f)
+    workers = result.get('memory') or []
+    rss = [worker['rss_mb'] for worker in workers if worker.get('rss_mb') is not None]
+    peaks = [worker['peak_rss_mb'] for worker in workers if worker.get('peak_rss_mb') is not None]
+    result['memory_mean_rss_mb'] = round(sum(rss) / len(rss), 1) if rss else None
+    result['memory_max_peak_rss_mb'] = max(peaks) if peaks else None
+    return result
+
+
+def lookup(result, path):
+    value = result
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def format_cell(value, baseline, higher_is_better):
+    if value is None:
+        return '-'
+    text = f"{value:g}" if isinstance(value, (int, float)) else str(value)
+    if baseline in (None, 0) or value == baseline:
+        return text
+    change = (value - baseline) / abs(baseline) * 100
+    better = (change > 0) == higher_is_better
+    return f"{text} ({change:+.1f}%{'' if better else ' worse'})"
+
+
+def column_title(path, result):
+    git = result.get('git') or {}
+    title = result.get('label') or git.get('commit') or os.path.basename(path)
+    return f"{title}{'*' if git.get('dirty') else ''}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare load test results against a baseline.")
+    parser.add_argument('results', nargs='+', help="results JSON files, baseline first")
+    args = parser.parse_args()
+
+    results = [load_result(path) for path in args.results]
+    headers = ['metric'] + [column_title(path, result) for path, result in zip(args.results, results)]
+    rows = []
+    for label, path, higher_is_better in METRICS:
+        baseline = lookup(results[0], path)
+        rows.append([label] + [format_cell(lookup(result, path), baseline, higher_is_better) for result in results])
+
+    widths = [max(len(row[i]) for row in [headers] + rows) for i in range(len(headers))]
+    for row in [headers] + rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+    configs = {json.dumps({k: v for k, v in (result.get('config') or {}).items() if k not in ('output', 'label', 'keep')},
+                          sort_keys=True) for result in results}
+    if len(configs) > 1:
+        print("\nNote: the runs used different load test settings; see each file's 'config'.")
+    if any((result.get('git') or {}).get('dirty') for result in results):
+        print("* run from a working tree with uncommitted changes")
+
+
+if __name__ == '__main__':
+    main()
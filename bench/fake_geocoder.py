@@ -0,0 +1,105 @@
+# fake_geocoder.py - Nominatim stand-in with configurable latency and failure rate
+#
+# Usage: python bench/fake_geocoder.py [--port 8091] [--latency 0.2] [--failure-rate 0.05] [--miss-rate 0.1]
+#
+# Answers /search?q=...&format=json like Nominatim. Coordinates are derived from a hash of the
+# query, so the same query always lands in the same place and runs are repeatable. Point the
+# server at it with NOMINATIM_DOMAIN=127.0.0.1:8091 NOMINATIM_SCHEME=http.
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_location(query):
+    """Stable [lon, lat] for a query, spread over the oceans' usual latitudes."""
+    digest = hashlib.sha1(query.lower().encode('utf-8')).digest()
+    lon = int.from_bytes(digest[:4], 'big') / 2 ** 32 * 360 - 180
+    lat = int.from_bytes(digest[4:8], 'big') / 2 ** 32 * 140 - 70
+    return round(lon, 5), round(lat, 5)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {'found': 0, 'not_found': 0, 'error': 0}
+
+    def add(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+
+def make_handler(latency, failure_rate, miss_rate, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                self._send(200, json.dumps(stats.counts).encode('utf-8'))
+                return
+            if url.path != '/search':
+                self._send(404, b'[]')
+                return
+            if latency:
+                time.sleep(latency)
+            query = parse_qs(url.query).get('q', [''])[0]
+            if random.random() < failure_rate:
+                stats.add('error')
+                self._send(503, b'{"error":"Service Unavailable"}')
+                return
+            # Misses depend on the query, not on chance, so a cached miss stays correct
+            if not query or fake_location(query + '#miss')[0] < -180 + 360 * miss_rate:
+                stats.add('not_found')
+                self._send(200, b'[]')
+                return
+            stats.add('found')
+            lon, lat = fake_location(query)
+            self._send(200, json.dumps([{
+                'place_id': int(hashlib.sha1(query.encode('utf-8')).hexdigest()[:8], 16),
+                'lat': str(lat), 'lon': str(lon),
+                'display_name': query, 'class': 'place', 'type': 'locality', 'importance': 0.5,
+            }]).encode('utf-8'))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Nominatim /search endpoint for offline benchmarks.")
+    parser.add_argument('--port', type=int, default=8091)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every search")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of searches answered with 503")
+    parser.add_argument('--miss-rate', type=float, default=0.0, help="fraction of queries that find nothing")
+    parser.add_argument('--seed', type=int, help="seed for the failure draws")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    stats = Stats()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port),
+                                 make_handler(args.latency, args.failure_rate, args.miss_rate, stats))
+    print(f"Fake geocoder at http://127.0.0.1:{args.port}/search (latency {args.latency}s, "
+          f"failure rate {args.failure_rate}, miss rate {args.miss_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# fixture_server.py - Replays saved USNI fleet tracker posts as a stand-in for news.usni.org
+#
+# Usage: python bench/fixture_server.py [--port 8090] [--fixtures bench/fixtures/usni] [--latency 0.05]
+#
+# Serves a generated category page (and /page/N/ archive pages) listing every fixture, newest
+# first, plus each fixture at /<file name without .html>/. Responses carry an ETag and honour
+# If-None-Match, so the scraper's conditional GET path is exercised too.
+
+import argparse
+import glob
+import hashlib
+import html
+import os
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'usni')
+CATEGORY_PATH = '/category/fleet-tracker/'
+POSTS_PER_PAGE = 10
+
+
+def _post_date(slug):
+    """'fleet-tracker-june-30-2025' -> 2025-06-30; slugs without a date sort first."""
+    try:
+        return datetime.strptime('-'.join(slug.split('-')[-3:]), '%B-%d-%Y')
+    except ValueError:
+        return datetime.min
+
+
+def load_posts(fixtures_dir):
+    """Returns [(slug, html bytes)], newest first."""
+    posts = []
+    for path in glob.glob(os.path.join(fixtures_dir, '*.html')):
+        with open(path, 'rb') as f:
+            posts.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    posts.sort(key=lambda post: (_post_date(post[0]), post[0]), reverse=True)
+    return posts
+
+
+def category_page(base_url, slugs, page):
+    """Archive page in the same markup the parser looks for: h3.title56 > a, with absolute links like the real site."""
+    items = ''.join(
+        f'<h3 class="entry-title td-module-title title56"><a href="{base_url}/{html.escape(slug)}/">{html.escape(slug)}</a></h3>\n'
+        for slug in slugs
+    )
+    return (f"<!DOCTYPE html><html><head><title>Fleet Tracker - Page {page}</title></head>"
+            f"<body><div class=\"td-ss-main-content\">\n{items}</div></body></html>").encode('utf-8')
+
+
+class FixtureSite:
+    def __init__(self, fixtures_dir, base_url):
+        self.pages = {}
+        posts = load_posts(fixtures_dir)
+        slugs = [slug for slug, _ in posts]
+        page_count = max(1, -(-len(slugs) // POSTS_PER_PAGE))
+        for page in range(1, page_count + 1):
+            body = category_page(base_url, slugs[(page - 1) * POSTS_PER_PAGE:page * POSTS_PER_PAGE], page)
+            self.pages[CATEGORY_PATH if page == 1 else f"{CATEGORY_PATH}page/{page}/"] = body
+        for slug, body in posts:
+            self.pages[f"/{slug}/"] = body
+        self.etags = {path: f'"{hashlib.sha1(body).hexdigest()[:16]}"' for path, body in self.pages.items()}
+        self.post_count = len(posts)
+
+    def lookup(self, path):
+        path = path.split('?', 1)[0]
+        if not path.endswith('/'):
+            path += '/'
+        return path, self.pages.get(path)
+
+
+def make_handler(site, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            path, body = site.lookup(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            etag = site.etags[path]
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve saved USNI pages for offline scraper runs.")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="directory of saved post HTML")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    site = FixtureSite(args.fixtures, f"http://127.0.0.1:{args.port}")
+    if not site.post_count:
+        raise SystemExit(f"No fixtures found in {args.fixtures}")
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(site, args.latency))
+    print(f"Serving {site.post_count} posts at http://127.0.0.1:{args.port}{CATEGORY_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+# load_test.py - Offline scrape-to-serve benchmark: fixtures in, gunicorn under load, JSON out
+#
+# Usage: python bench/load_test.py [--workers 2] [--concurrency 16] [--duration 15]
+#                                  [--path /api/fleet] [--geocoder-latency 0.2] [--geocoder-failure-rate 0.05]
+#
+# Starts bench/fixture_server.py and bench/fake_geocoder.py, runs scraper.py and backfill.py
+# against them into a throwaway database, then serves it with gunicorn and drives the given
+# paths at a fixed concurrency. Nothing touches news.usni.org, Nominatim or ./fleet.db.
+# Results land in bench/results/ as JSON; compare runs with bench/compare_results.py.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+STARTUP_TIMEOUT_SECONDS = 30
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_http(url, timeout=STARTUP_TIMEOUT_SECONDS):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_process(args, env, log_path):
+    log = open(log_path, 'wb')
+    return subprocess.Popen(args, cwd=REPO_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop_process(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': dirty}
+
+
+# --- PIPELINE: SCRAPE AND BACKFILL FROM FIXTURES ---
+def run_step(args, env, log_path):
+    """Runs a pipeline script to completion. Returns its wall time in seconds."""
+    start = time.perf_counter()
+    with open(log_path, 'wb') as log:
+        subprocess.run(args, cwd=REPO_DIR, env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+    return time.perf_counter() - start
+
+
+def read_pipeline_results(database_file):
+    conn = sqlite3.connect(database_file)
+    conn.row_factory = sqlite3.Row
+    try:
+        run = conn.execute("SELECT duration_seconds, outcome, ship_count, stages FROM scrape_runs ORDER BY id DESC LIMIT 1").fetchone()
+        reports = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        'scraper_run': {**dict(run), 'stages': json.loads(run['stages'])} if run else None,
+        'reports': reports,
+    }
+
+
+# --- LOAD ---
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def drive_load(base_url, paths, concurrency, duration, accept_encoding):
+    """
+    Each of `concurrency` threads requests the paths round-robin, back to back, until the
+    deadline. Bodies are read but not decompressed, so client CPU stays out of the numbers.
+    """
+    deadline = time.perf_counter() + duration
+    latencies = []
+    statuses = {}
+    totals = {'bytes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(offset):
+        session = requests.Session()
+        session.headers['Accept-Encoding'] = accept_encoding
+        local_latencies, local_statuses, local_bytes, local_errors = [], {}, 0, 0
+        i = offset
+        while time.perf_counter() < deadline:
+            url = base_url + paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = session.get(url, stream=True, timeout=30)
+                body = response.raw.read(decode_content=False)
+                response.close()
+            except requests.RequestException:
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+            local_bytes += len(body)
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+            totals['bytes'] += local_bytes
+            totals['errors'] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': totals['errors'],
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'bytes_per_request': round(totals['bytes'] / len(latencies)) if latencies else None,
+        'latency_ms': {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (('p50', percentile(latencies, 0.50)), ('p95', percentile(latencies, 0.95)),
+                                ('p99', percentile(latencies, 0.99)),
+                                ('max', latencies[-1] if latencies else None))
+        },
+    }
+
+
+# --- MEMORY ---
+def _proc_status(pid):
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                fields[key] = value.strip()
+    except OSError:
+        pass
+    return fields
+
+
+def _kb_to_mb(value):
+    return round(int(value.split()[0]) / 1024, 1) if value else None
+
+
+def worker_memory(master_pid):
+    """RSS and peak RSS of each gunicorn worker, read from /proc. Empty where /proc isn't available."""
+    workers = []
+    if not os.path.isdir('/proc'):
+        return workers
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        status = _proc_status(entry)
+        if status.get('PPid') == str(master_pid):
+            workers.append({'pid': int(entry), 'rss_mb': _kb_to_mb(status.get('VmRSS')),
+                            'peak_rss_mb': _kb_to_mb(status.get('VmHWM'))})
+    return sorted(workers, key=lambda worker: worker['pid'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrape-to-serve pipeline offline.")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=1, help="threads per gunicorn worker")
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent client connections")
+    parser.add_argument('--duration', type=float, default=15.0, help="seconds of measured load")
+    parser.add_argument('--warmup', type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument('--path', action='append', dest='paths', help="path to request, repeatable (default /api/fleet)")
+    parser.add_argument('--accept-encoding', default='br, gzip', help="Accept-Encoding sent by the clients")
+    parser.add_argument('--fixture-latency', type=float, default=0.0, help="seconds added to every fixture response")
+    parser.add_argument('--geocoder-latency', type=float, default=0.0, help="seconds added to every geocoder search")
+    parser.add_argument('--geocoder-failure-rate', type=float, default=0.0, help="fraction of searches that fail with 503")
+    parser.add_argument('--geocoder-miss-rate', type=float, default=0.0, help="fraction of queries that find nothing")
+    parser.add_argument('--backfill-pages', type=int, default=5, help="archive pages backfilled; 0 skips the backfill")
+    parser.add_argument('--label', help="free-form note stored with the results")
+    parser.add_argument('--output', help="results file (default bench/results/<time>-<commit>.json)")
+    parser.add_argument('--keep', action='store_true', help="keep the work directory with the database and logs")
+    args = parser.parse_args()
+    paths = args.paths or ['/api/fleet']
+
+    workdir = tempfile.mkdtemp(prefix='fleet-bench-')
+    database_file = os.path.join(workdir, 'fleet.db')
+    fixture_port, geocoder_port, server_port = free_port(), free_port(), free_port()
+    env = {
+        **os.environ,
+        'FLEET_DATABASE': database_file,
+        'USNI_CATEGORY_URL': f"http://127.0.0.1:{fixture_port}/category/fleet-tracker/",
+        'NOMINATIM_DOMAIN': f"127.0.0.1:{geocoder_port}",
+        'NOMINATIM_SCHEME': 'http',
+        'LOG_LEVEL': 'WARNING',
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+    }
+    processes = []
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'label': args.label,
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {**vars(args), 'paths': paths},
+    }
+
+    try:
+        processes.append(start_process(
+            [sys.executable, os.path.join(BENCH_DIR, 'fixture_server.py'), '--port', str(fixture_port),
+             '--latency', str(args.fixture_latency)], env, os.path.join(workdir, 'fixture_server.log')))
+        processes.append(start_process(
+            [sys.executable, os.path.join(BENCH_DIR, 'fake_geocoder.py'), '--port', str(geocoder_port),
+             '--latency', str(args.geocoder_latency), '--failure-rate', str(args.geocoder_failure_rate),
+             '--miss-rate', str(args.geocoder_miss_rate), '--seed', '1'], env, os.path.join(workdir, 'fake_geocoder.log')))
+        wait_for_http(f"http://127.0.0.1:{fixture_port}/")
+        wait_for_http(f"http://127.0.0.1:{geocoder_port}/stats")
+
+        print("Scraping fixtures...")
+        pipeline = {'scrape_seconds': round(run_step([sys.executable, 'scraper.py'], env,
+                                                     os.path.join(workdir, 'scraper.log')), 3)}
+        if args.backfill_pages:
+            print("Backfilling fixtures...")
+            pipeline['backfill_seconds'] = round(run_step(
+                [sys.executable, 'backfill.py', '--pages', str(args.backfill_pages), '--rate', '1000',
+                 '--category-url', env['USNI_CATEGORY_URL']], env, os.path.join(workdir, 'backfill.log')), 3)
+        pipeline.update(read_pipeline_results(database_file))
+        results['pipeline'] = pipeline
+        if not pipeline['reports']:
+            print(f"Warning: the pipeline stored no reports; the server will serve its fallback data. See the logs in {workdir}.")
+
+        print(f"Starting gunicorn with {args.workers} workers...")
+        gunicorn = start_process(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--threads', str(args.threads),
+             '--bind', f"127.0.0.1:{server_port}", '--timeout', '120', 'server:app'],
+            env, os.path.join(workdir, 'gunicorn.log'))
+        processes.append(gunicorn)
+        base_url = f"http://127.0.0.1:{server_port}"
+        wait_for_http(f"{base_url}/metrics")
+
+        # The first request in a worker builds its snapshot, geocoding included
+        start = time.perf_counter()
+        requests.get(base_url + paths[0], timeout=300).raise_for_status()
+        results['first_request_seconds'] = round(time.perf_counter() - start, 3)
+
+        if args.warmup:
+            drive_load(base_url, paths, args.concurrency, args.warmup, args.accept_encoding)
+        print(f"Measuring {args.duration:.0f}s at concurrency {args.concurrency}...")
+        results['load'] = drive_load(base_url, paths, args.concurrency, args.duration, args.accept_encoding)
+        results['memory'] = worker_memory(gunicorn.pid)
+        results['geocoder'] = requests.get(f"http://127.0.0.1:{geocoder_port}/stats", timeout=5).json()
+    finally:
+        for process in reversed(processes):
+            stop_process(process)
+        if args.keep:
+            print(f"Work directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{results['git']['commit'] or 'unknown'}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    load = results['load']
+    print(f"{load['requests_per_second']} req/s, p50 {load['latency_ms']['p50']} ms, "
+          f"p95 {load['latency_ms']['p95']} ms, p99 {load['latency_ms']['p99']} ms, {load['errors']} errors")
+    for worker in results['memory']:
+        print(f"worker {worker['pid']}: {worker['rss_mb']} MB RSS (peak {worker['peak_rss_mb']} MB)")
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# gazetteer.py - Offline lookup of the seas, straits and naval ports that show up in USNI statuses
+
+import re
+from collections import deque
+
+# Each entry is ([names and common abbreviations], [lon, lat]).
+# Coordinates are a representative point for the area, not a precise fix; for bodies of water
+# they sit in open water so markers don't land on the coast.
+PLACES = [
+    # --- Mediterranean & Europe ---
+    (["Eastern Mediterranean", "Eastern Med", "East Med"], [31.0, 33.8]),
+    (["Western Mediterranean", "Western Med"], [4.5, 39.5]),
+    (["Central Mediterranean", "Central Med"], [17.0, 35.5]),
+    (["Mediterranean Sea", "Mediterranean", "Med"], [18.0, 35.5]),
+    (["Ionian Sea"], [19.0, 38.0]),
+    (["Adriatic Sea", "Adriatic"], [15.5, 43.0]),
+    (["Aegean Sea", "Aegean"], [25.0, 38.5]),
+    (["Tyrrhenian Sea"], [12.0, 40.0]),
+    (["Black Sea"], [34.0, 43.5]),
+    (["Baltic Sea", "Baltic"], [19.0, 56.5]),
+    (["North Sea"], [3.5, 56.5]),
+    (["Norwegian Sea"], [3.0, 68.0]),
+    (["Barents Sea"], [37.0, 73.0]),
+    (["English Channel"], [-2.0, 50.2]),
+    (["Strait of Gibraltar"], [-5.6, 35.95]),
+    (["Bay of Biscay"], [-5.0, 45.5]),
+    (["Rota", "Naval Station Rota"], [-6.35, 36.62]),
+    (["Souda Bay"], [24.15, 35.49]),
+    (["Naples, Italy", "Naval Support Activity Naples"], [14.27, 40.84]),
+    (["Gaeta"], [13.57, 41.21]),
+    (["Portsmouth, England", "HMNB Portsmouth"], [-1.11, 50.80]),
+    (["Toulon"], [5.93, 43.11]),
+    (["Split, Croatia"], [16.44, 43.51]),
+    (["Limassol"], [33.04, 34.67]),
+    (["Haifa"], [34.99, 32.82]),
+    (["Reykjavik"], [-21.94, 64.15]),
+    (["Oslo"], [10.73, 59.90]),
+    (["Plymouth, England", "HMNB Devonport"], [-4.14, 50.37]),
+    (["Faslane"], [-4.82, 56.07]),
+    # --- Middle East ---
+    (["Red Sea"], [38.5, 20.0]),
+    (["Gulf of Aden"], [48.0, 12.5]),
+    (["Bab el-Mandeb", "Bab al-Mandab"], [43.4, 12.6]),
+    (["Suez Canal"], [32.35, 30.5]),
+    (["Gulf of Oman"], [58.0, 24.5]),
+    (["Arabian Sea"], [63.0, 17.0]),
+    (["North Arabian Sea"], [63.0, 22.0]),
+    (["Persian Gulf", "Arabian Gulf"], [51.5, 27.0]),
+    (["Strait of Hormuz"], [56.4, 26.6]),
+    (["Bahrain", "Manama"], [50.61, 26.21]),
+    (["Djibouti"], [43.14, 11.60]),
+    (["Duqm"], [57.70, 19.67]),
+    (["Jebel Ali", "Dubai"], [55.03, 25.01]),
+    (["Salalah"], [54.00, 16.94]),
+    (["Aqaba"], [35.00, 29.52]),
+    # --- Indian Ocean ---
+    (["Indian Ocean"], [75.0, -5.0]),
+    (["Diego Garcia"], [72.42, -7.31]),
+    (["Bay of Bengal"], [88.0, 15.0]),
+    (["Andaman Sea"], [96.0, 10.0]),
+    (["Strait of Malacca"], [100.5, 3.5]),
+    (["Singapore", "Changi"], [103.99, 1.32]),
+    # --- Pacific ---
+    (["South China Sea"], [114.0, 13.5]),
+    (["East China Sea"], [126.0, 29.5]),
+    (["Philippine Sea"], [133.0, 18.0]),
+    (["Sea of Japan", "East Sea"], [135.0, 40.0]),
+    (["Yellow Sea", "West Sea"], [123.5, 35.5]),
+    (["Taiwan Strait"], [119.5, 24.3]),
+    (["Sulu Sea"], [120.5, 8.5]),
+    (["Celebes Sea"], [122.0, 3.5]),
+    (["Java Sea"], [110.0, -5.0]),
+    (["Coral Sea"], [155.0, -17.0]),
+    (["Tasman Sea"], [160.0, -38.0]),
+    (["Western Pacific", "WESTPAC"], [140.0, 20.0]),
+    (["Eastern Pacific", "EASTPAC"], [-125.0, 20.0]),
+    (["Central Pacific"], [-160.0, 15.0]),
+    (["South Pacific"], [-150.0, -25.0]),
+    (["Pacific Ocean", "Pacific"], [-160.0, 20.0]),
+    (["Bering Sea"], [-178.0, 58.0]),
+    (["Gulf of Alaska"], [-145.0, 57.0]),
+    (["Yokosuka"], [139.67, 35.29]),
+    (["Sasebo"], [129.72, 33.16]),
+    (["Okinawa", "White Beach"], [127.86, 26.30]),
+    (["Guam", "Apra Harbor"], [144.66, 13.44]),
+    (["Busan"], [129.04, 35.10]),
+    (["Manila", "Subic Bay"], [120.27, 14.79]),
+    (["Darwin"], [130.84, -12.46]),
+    (["Sydney, Australia", "Fleet Base East"], [151.23, -33.85]),
+    (["Pearl Harbor", "Joint Base Pearl Harbor-Hickam"], [-157.95, 21.35]),
+    (["Hawaii", "Oahu"], [-157.98, 21.30]),
+    (["San Diego", "Naval Base San Diego", "North Island"], [-117.14, 32.68]),
+    (["Bremerton"], [-122.63, 47.56]),
+    (["Everett, Wash.", "Naval Station Everett"], [-122.22, 47.99]),
+    (["Bangor, Wash.", "Naval Base Kitsap-Bangor"], [-122.73, 47.73]),
+    (["Port Hueneme"], [-119.21, 34.15]),
+    (["Southern California", "SOCAL"], [-119.0, 32.6]),
+    # --- Atlantic & Americas ---
+    (["North Atlantic"], [-35.0, 50.0]),
+    (["South Atlantic"], [-20.0, -20.0]),
+    (["Western Atlantic"], [-65.0, 32.0]),
+    (["Eastern Atlantic"], [-20.0, 35.0]),
+    (["Atlantic Ocean", "Atlantic"], [-35.0, 30.0]),
+    (["Caribbean Sea", "Caribbean"], [-75.0, 15.0]),
+    (["Gulf of Mexico"], [-90.0, 25.0]),
+    (["Gulf of Guinea", "West Africa"], [2.0, 2.0]),
+    (["Norfolk", "Naval Station Norfolk"], [-76.33, 36.95]),
+    (["Virginia Capes"], [-75.0, 36.8]),
+    (["Newport News"], [-76.45, 36.98]),
+    (["Little Creek"], [-76.18, 36.92]),
+    (["Mayport"], [-81.40, 30.39]),
+    (["Jacksonville, Fla."], [-81.40, 30.39]),
+    (["Kings Bay"], [-81.51, 30.80]),
+    (["Groton"], [-72.09, 41.39]),
+    (["Portsmouth Naval Shipyard", "Kittery"], [-70.74, 43.08]),
+    (["Pascagoula"], [-88.56, 30.35]),
+    (["Bath, Maine"], [-69.81, 43.91]),
+    (["Halifax"], [-63.57, 44.65]),
+    (["Guantanamo Bay"], [-75.15, 19.90]),
+    (["Arctic Ocean", "Arctic"], [0.0, 80.0]),
+]
+
+
+def normalize(text):
+    """Lowercases and turns punctuation into spaces: 'Norfolk, Va.' -> 'norfolk va'."""
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+class _Matcher:
+    """
+    Aho-Corasick automaton over normalized place names. A single pass over the
+    text reports every name that occurs on word boundaries.
+    """
+
+    def __init__(self, patterns):
+        # Node 0 is the root. Each node: transitions, failure link, list of (pattern length, value).
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), value))
+
+        # Breadth-first pass to wire up failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def find_all(self, text):
+        """Yields (start, end, value) for every whole-word match in text."""
+        node = 0
+        last = len(text)
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, value in self._out[node]:
+                start = i - length + 1
+                if (start == 0 or text[start - 1] == ' ') and (i + 1 == last or text[i + 1] == ' '):
+                    yield start, i + 1, value
+
+
+_matcher = _Matcher(
+    (normalize(name), coords) for names, coords in PLACES for name in names
+)
+
+
+# Words that introduce where a ship is: 'operating IN the Red Sea', 'OFF Okinawa'
+LOCATION_KEYWORDS = {'in', 'at', 'off', 'near', 'into', 'inside', 'pierside', 'transiting', 'entering'}
+# Words that may sit between the keyword and the place: 'in port in', 'off the coast of'
+FILLER_WORDS = {'the', 'a', 'port', 'waters', 'vicinity', 'coast', 'area', 'of'} | LOCATION_KEYWORDS
+# Base names the table leaves out: 'at Naval Station Mayport' is looked up as 'Mayport'
+INSTALLATION_PREFIX_PATTERN = re.compile(
+    r'(naval (air |submarine |weapons )?(station|base)|naval support activity|fleet activities'
+    r'|joint (\w+ )?base|marine corps base|hmnb) '
+)
+_WORD_PATTERN = re.compile(r'[A-Za-z0-9]+')
+
+
+def _non_overlapping(matches):
+    """Keeps the longest of any overlapping matches, so 'Eastern Mediterranean' beats 'Mediterranean'."""
+    kept = []
+    for start, end, coords in sorted(matches, key=lambda m: (m[0] - m[1], m[0])):
+        if all(end <= k_start or start >= k_end for k_start, k_end, _ in kept):
+            kept.append((start, end, coords))
+    return sorted(kept, key=lambda m: m[0])
+
+
+def lookup(status_text):
+    """
+    Returns [lon, lat] for the place the status puts the ship, or None.
+    Statuses often name several places ('Arrived in Rota after operating in the Eastern
+    Mediterranean'), so the first known place right after a location keyword wins. When the
+    keywords only introduce places the gazetteer doesn't know ('off the Horn of Africa after a
+    port visit to Souda Bay'), this returns None and the caller falls through to Nominatim rather
+    than picking a place that was merely mentioned. Statuses without any location keyword use
+    their first known place.
+    """
+    words = list(_WORD_PATTERN.finditer(status_text))
+    text = ' '.join(word.group().lower() for word in words)
+    offsets = []
+    position = 0
+    for word in words:
+        offsets.append(position)
+        position += len(word.group()) + 1
+
+    matches = _non_overlapping(_matcher.find_all(text))
+    if not matches:
+        return None
+    by_start = {start: coords for start, _, coords in matches}
+
+    unknown_place = False
+    for i, word in enumerate(words):
+        if word.group().lower() not in LOCATION_KEYWORDS:
+            continue
+        j = i + 1
+        while j < len(words) and words[j].group().lower() in FILLER_WORDS:
+            j += 1
+        if j == len(words):
+            continue
+        if offsets[j] in by_start:
+            return list(by_start[offsets[j]])
+        prefix = INSTALLATION_PREFIX_PATTERN.match(text, offsets[j])
+        if prefix and prefix.end() in by_start:
+            return list(by_start[prefix.end()])
+        # A capitalized word after the keyword is a place name, just not one we know
+        if words[j].group()[0].isupper():
+            unknown_place = True
+    if unknown_place:
+        return None
+    return list(matches[0][2])
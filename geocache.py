@@ -0,0 +1,100 @@
+# geocache.py - Persistent geocode cache shared by all server workers
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Successful lookups almost never move, misses are retried sooner in case Nominatim learns the place.
+GEOCODE_HIT_TTL_SECONDS = 30 * 24 * 3600
+GEOCODE_MISS_TTL_SECONDS = 24 * 3600
+GEOCODE_LRU_SIZE = 512
+
+
+def normalize_query(query):
+    """Lowercases and collapses whitespace so 'Port of  Norfolk.' and 'port of norfolk' share an entry."""
+    return ' '.join(query.lower().split()).strip(' .,;')
+
+
+class GeocodeCache:
+    """
+    Two-level cache in front of the geocoder: a small in-process LRU backed by the
+    geocode_cache table in fleet.db. The table is the shared layer, so every gunicorn
+    worker benefits from a lookup made by any other worker.
+    Both hits and misses are remembered, each with its own TTL.
+    """
+
+    def __init__(self, database_file, hit_ttl=GEOCODE_HIT_TTL_SECONDS,
+                 miss_ttl=GEOCODE_MISS_TTL_SECONDS, lru_size=GEOCODE_LRU_SIZE):
+        self.database_file = database_file
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_file, timeout=5)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    query TEXT PRIMARY KEY, longitude REAL, latitude REAL,
+                    found INTEGER NOT NULL, expires_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _lru_get(self, key, now):
+        with self._lru_lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return entry
+
+    def _lru_put(self, key, coords, expires_at):
+        with self._lru_lock:
+            self._lru[key] = (coords, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, query):
+        """
+        Returns (cached, coords). cached is False when the query has never been seen or
+        its entry expired; otherwise coords is [lon, lat] for a hit or None for a remembered miss.
+        """
+        key = normalize_query(query)
+        now = time.time()
+
+        entry = self._lru_get(key, now)
+        if entry is not None:
+            return True, entry[0]
+
+        row = self._connection().execute(
+            "SELECT longitude, latitude, found, expires_at FROM geocode_cache WHERE query = ?", (key,)
+        ).fetchone()
+        if not row or row[3] <= now:
+            return False, None
+
+        coords = [row[0], row[1]] if row[2] else None
+        self._lru_put(key, coords, row[3])
+        return True, coords
+
+    def put(self, query, coords):
+        key = normalize_query(query)
+        expires_at = time.time() + (self.hit_ttl if coords else self.miss_ttl)
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO geocode_cache (query, longitude, latitude, found, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key, coords[0] if coords else None, coords[1] if coords else None, 1 if coords else 0, expires_at)
+        )
+        conn.commit()
+        self._lru_put(key, coords, expires_at)
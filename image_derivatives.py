@@ -0,0 +1,197 @@
+# image_derivatives.py - Resized, content-hashed copies of the ship photos in images/
+
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGES_DIR = os.path.join(BASE_DIR, 'images')
+DERIVATIVES_DIR = os.path.join(BASE_DIR, 'image_cache')
+DERIVATIVES_URL_PREFIX = 'images/d/'
+
+# Longest edge in pixels. 'thumb' fills the database cards, 'popup' the details modal.
+SIZES = {'thumb': 480, 'popup': 1280}
+QUALITY = {'webp': 78, 'jpg': 82}
+# Bump to invalidate every derivative after changing how they are produced
+PIPELINE_VERSION = 1
+
+# Derivative names look like 'cvn78.popup.3f9a1c2b7d4e.webp'
+DERIVATIVE_NAME_PATTERN = re.compile(r'^(?P<stem>[\w-]+)\.(?P<size>[a-z]+)\.(?P<digest>[0-9a-f]{12})\.(?P<ext>webp|jpg)$')
+
+logger = logging.getLogger(__name__)
+
+_digest_cache = {}
+_lock = threading.Lock()
+
+# Derivatives missing at snapshot time are rendered here, one at a time, off the request path
+_render_queue = queue.Queue()
+_pending = set()
+_pending_lock = threading.Lock()
+_renderer_started = False
+# Advances each time the render queue drains, so the server knows to pick up the new URLs
+_render_generation = 0
+
+
+def output_format():
+    """WebP when Pillow was built with it, otherwise JPEG."""
+    return 'webp' if features.check('webp') else 'jpg'
+
+
+def _source_path(stem):
+    path = os.path.join(IMAGES_DIR, f"{stem}.jpg")
+    return path if os.path.isfile(path) else None
+
+
+def _digest(source_path, size, ext):
+    """Hash of the source bytes plus the settings that shape the output. Cached by (path, mtime, size on disk)."""
+    stat = os.stat(source_path)
+    key = (source_path, stat.st_mtime_ns, stat.st_size, size, ext)
+    digest = _digest_cache.get(key)
+    if digest is None:
+        h = hashlib.sha1(f"{PIPELINE_VERSION}:{size}:{SIZES[size]}:{ext}:{QUALITY[ext]}:".encode())
+        with open(source_path, 'rb') as f:
+            h.update(f.read())
+        digest = h.hexdigest()[:12]
+        _digest_cache[key] = digest
+    return digest
+
+
+def _render(source_path, size, ext, destination):
+    max_edge = SIZES[size]
+    with Image.open(source_path) as img:
+        # Let the JPEG decoder downscale while decoding; much cheaper than a full-size decode
+        img.draft('RGB', (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        # Write to a temp name first so concurrent workers never serve a half-written file
+        tmp_path = f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if ext == 'webp':
+            img.save(tmp_path, 'WEBP', quality=QUALITY[ext], method=4)
+        else:
+            img.save(tmp_path, 'JPEG', quality=QUALITY[ext], optimize=True, progressive=True)
+    os.replace(tmp_path, destination)
+
+
+def derivative_name(stem, size):
+    """
+    Returns the derivative file name for images/<stem>.jpg at the given size without rendering
+    anything. Returns None if there is no such source image or no Pillow.
+    """
+    source_path = _source_path(stem)
+    if Image is None or source_path is None or size not in SIZES:
+        return None
+    ext = output_format()
+    return f"{stem}.{size}.{_digest(source_path, size, ext)}.{ext}"
+
+
+def get_derivative(stem, size):
+    """
+    Returns the derivative file name for images/<stem>.jpg at the given size, rendering it
+    into the cache on first use. Returns None if there is no such source image or no Pillow.
+    """
+    name = derivative_name(stem, size)
+    if name is None:
+        return None
+    source_path = _source_path(stem)
+    ext = name.rsplit('.', 1)[1]
+    destination = os.path.join(DERIVATIVES_DIR, name)
+    if not os.path.isfile(destination):
+        with _lock:
+            if not os.path.isfile(destination):
+                os.makedirs(DERIVATIVES_DIR, exist_ok=True)
+                _render(source_path, size, ext, destination)
+    return name
+
+
+def ensure_derivative(name):
+    """
+    Makes sure a requested derivative exists on disk, e.g. after the cache directory was cleared.
+    Returns False for names that don't match a current source image and settings.
+    """
+    match = DERIVATIVE_NAME_PATTERN.match(name)
+    if not match:
+        return False
+    if os.path.isfile(os.path.join(DERIVATIVES_DIR, name)):
+        return True
+    return get_derivative(match.group('stem'), match.group('size')) == name
+
+
+def render_generation():
+    return _render_generation
+
+
+def _render_loop():
+    global _render_generation
+    while True:
+        stem, size = _render_queue.get()
+        try:
+            get_derivative(stem, size)
+        except Exception as e:
+            logger.warning("Could not build %s derivative for images/%s.jpg: %s", size, stem, e)
+        finally:
+            with _pending_lock:
+                _pending.discard((stem, size))
+                if not _pending:
+                    _render_generation += 1
+
+
+def queue_render(stem, size):
+    """Renders a derivative on the background thread unless it is already queued."""
+    global _renderer_started
+    with _pending_lock:
+        if (stem, size) in _pending:
+            return
+        _pending.add((stem, size))
+        if not _renderer_started:
+            _renderer_started = True
+            threading.Thread(target=_render_loop, name="image-derivatives", daemon=True).start()
+    _render_queue.put((stem, size))
+
+
+def image_fields(image_path):
+    """
+    Maps a ship's 'images/<stem>.jpg' to {'image': popup URL, 'thumbnail': thumb URL}.
+    Only derivatives already on disk are used; missing ones are queued for rendering and the
+    original path is served until they exist.
+    """
+    stem, ext = os.path.splitext(os.path.basename(image_path or ''))
+    if not image_path or ext.lower() != '.jpg':
+        return {'image': image_path, 'thumbnail': image_path}
+    fields = {}
+    for field, size in (('image', 'popup'), ('thumbnail', 'thumb')):
+        try:
+            name = derivative_name(stem, size)
+        except OSError as e:
+            logger.warning("Could not read %s for its %s derivative: %s", image_path, size, e)
+            name = None
+        if name and not os.path.isfile(os.path.join(DERIVATIVES_DIR, name)):
+            queue_render(stem, size)
+            name = None
+        fields[field] = f"{DERIVATIVES_URL_PREFIX}{name}" if name else image_path
+    return fields
+
+
+def build_all():
+    """Pre-renders every derivative, e.g. as a deploy step, so the first snapshot already serves them."""
+    for filename in sorted(os.listdir(IMAGES_DIR)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() != '.jpg':
+            continue
+        for size in SIZES:
+            name = get_derivative(stem, size)
+            logger.info("%s -> %s (%d KB)", filename, name, os.path.getsize(os.path.join(DERIVATIVES_DIR, name)) // 1024)
+
+
+if __name__ == '__main__':
+    if Image is None:
+        raise SystemExit("Pillow is required to build image derivatives.")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    build_all()
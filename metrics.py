@@ -0,0 +1,230 @@
+# metrics.py - Minimal counters and histograms with Prometheus text output
+#
+# Each process keeps its own values. Under gunicorn every worker sits behind the same port, so a
+# scrape would otherwise see whichever worker answered. With a shared directory, each worker
+# writes its values there every few seconds (start_flusher) and render() sums them, so one
+# /metrics scrape covers the whole server. Empty the directory when the server is redeployed.
+
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; covers a gazetteer hit (microseconds) up to a slow Nominatim call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# How often each worker writes its values to the shared directory
+FLUSH_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+_registry = []
+_registry_lock = threading.Lock()
+_flusher_pid = None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def state(self):
+        """A copy of the current values, safe to serialize or merge."""
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    def _copy(self, value):
+        return value
+
+    def merge(self, a, b):
+        """Combines one series' values from two workers."""
+        return a + b
+
+    def render(self, values=None):
+        if values is None:
+            values = self.state()
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(values.items()):
+            lines.extend(self._render_series(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def merge(self, a, b):
+        # Gauges describe a state, not a total; the most recent writer wins
+        return b
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def _copy(self, series):
+        return [list(series[0]), series[1], series[2]]
+
+    def merge(self, a, b):
+        if len(a[0]) != len(b[0]):
+            # Written by a worker with different buckets, e.g. mid-deploy; keep the newer one
+            return b
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_series(self, key, series):
+        counts, total, count = series
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def _registered():
+    with _registry_lock:
+        return list(_registry)
+
+
+def write_state(directory):
+    """Writes this process's values to <directory>/<pid>.json, atomically."""
+    state = {metric.name: [[list(key), value] for key, value in metric.state().items()] for metric in _registered()}
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _flush_loop(directory, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_state(directory)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", directory, e)
+
+
+def start_flusher(directory, interval=FLUSH_SECONDS):
+    """
+    Starts writing this process's values to the shared directory every `interval` seconds.
+    Safe to call on every request; it starts once per process, including after a fork.
+    """
+    global _flusher_pid
+    with _registry_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    os.makedirs(directory, exist_ok=True)
+    threading.Thread(target=_flush_loop, args=(directory, interval), name="metrics-flusher", daemon=True).start()
+    atexit.register(write_state, directory)
+
+
+def _read_states(directory):
+    """Values written by the other processes, oldest file first. Files of exited workers are kept,
+    so counters never go backwards when gunicorn replaces a worker."""
+    own = os.path.join(directory, f"{os.getpid()}.json")
+    states = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json')), key=os.path.getmtime):
+        if path == own:
+            continue
+        try:
+            with open(path) as f:
+                states.append({name: {tuple(key): value for key, value in series} for name, series in json.load(f).items()})
+        except (OSError, ValueError):
+            continue
+    return states
+
+
+def render(directory=None):
+    """
+    All registered metrics in the Prometheus text exposition format. With a directory, the
+    values every worker wrote there are summed with this process's live values.
+    """
+    metrics = _registered()
+    states = _read_states(directory) if directory and os.path.isdir(directory) else []
+    lines = []
+    for metric in metrics:
+        merged = {}
+        for values in [state.get(metric.name, {}) for state in states] + [metric.state()]:
+            for key, value in values.items():
+                merged[key] = metric.merge(merged[key], value) if key in merged else value
+        lines.extend(metric.render(merged))
+    return '\n'.join(lines) + '\n'
@@ -1,10 +1,17 @@
 # scraper.py (v15 - Interactive Debugging & Cookie Handling)
 
 import sqlite3
-import re
 from datetime import datetime
+import hashlib
+import json
+import logging
+import os
 import time
-from bs4 import BeautifulSoup
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from usni_parser import parse_dated_post, parse_latest_post_urls, parse_report_date
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
@@ -13,86 +20,220 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-DATABASE_FILE = 'fleet.db'
-USNI_CATEGORY_URL = 'https://news.usni.org/category/fleet-tracker'
-
-HULL_TO_CLASS = {
-    'CVN': 'Aircraft Carrier', 'LHA': 'Amphibious Assault Ship', 'LHD': 'Amphibious Assault Ship',
-    'LPD': 'Amphibious Transport Dock', 'LSD': 'Dock Landing Ship', 'CG': 'Cruiser',
-    'DDG': 'Destroyer', 'LCS': 'Littoral Combat Ship', 'SSN': 'Submarine',
-    'SSBN': 'Submarine', 'SSGN': 'Submarine', 'ESB': 'Expeditionary Sea Base',
-    'LCC': 'Command Ship', 'T-AO': 'Replenishment Oiler', 'R': 'Aircraft Carrier',
-    'DDH': 'Helicopter Destroyer'
-}
-
-def get_class_from_hull(hull):
-    match = re.match(r'([A-Z]+)', hull)
-    if match:
-        prefix = match.group(1)
-        return HULL_TO_CLASS.get(prefix, 'Unknown')
-    return 'Unknown'
+DATABASE_FILE = os.environ.get('FLEET_DATABASE', 'fleet.db')
+# Overridable so benchmarks can point the scraper at bench/fixture_server.py
+USNI_CATEGORY_URL = os.environ.get('USNI_CATEGORY_URL', 'https://news.usni.org/category/fleet-tracker')
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+REQUEST_TIMEOUT_SECONDS = 15
+# Parser backend for posts, see usni_parser.BACKENDS
+PARSER_BACKEND = 'lxml'
+# How long a writer waits for another writer before giving up. Readers never block under WAL.
+DB_TIMEOUT_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+def connect_db():
+    return sqlite3.connect(DATABASE_FILE, timeout=DB_TIMEOUT_SECONDS)
 
 def init_db():
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = connect_db()
     cursor = conn.cursor()
+    # WAL lets the server keep reading the last committed state while a refresh is being written.
+    # The setting is stored in the database file, so every later connection gets it.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Append-only history: one row per ship per fleet tracker post.
+    # The primary key doubles as the per-hull index for track queries.
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ships (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, hull TEXT, class TEXT,
+        CREATE TABLE IF NOT EXISTS reports (
+            hull TEXT NOT NULL, report_date TEXT NOT NULL, name TEXT NOT NULL, class TEXT,
+            status TEXT, locationReported TEXT, source_url TEXT,
+            PRIMARY KEY (hull, report_date)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reports_date ON reports (report_date)")
+    # Compact latest-position view: one row per hull, kept current by a trigger on reports
+    # so readers never have to scan the history.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS latest_positions (
+            hull TEXT PRIMARY KEY, report_date TEXT NOT NULL, name TEXT NOT NULL, class TEXT,
             status TEXT, locationReported TEXT
         )
     ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS reports_update_latest AFTER INSERT ON reports
+        BEGIN
+            INSERT INTO latest_positions (hull, report_date, name, class, status, locationReported)
+            VALUES (NEW.hull, NEW.report_date, NEW.name, NEW.class, NEW.status, NEW.locationReported)
+            ON CONFLICT(hull) DO UPDATE SET
+                report_date = excluded.report_date, name = excluded.name, class = excluded.class,
+                status = excluded.status, locationReported = excluded.locationReported
+            WHERE excluded.report_date >= latest_positions.report_date;
+        END
+    ''')
+    _migrate_ships_table(cursor)
+    _repair_report_dates(cursor)
+    # Catch up on reports written before the trigger existed
+    cursor.execute('''
+        INSERT OR IGNORE INTO latest_positions (hull, report_date, name, class, status, locationReported)
+        SELECT hull, MAX(report_date), name, class, status, locationReported FROM reports GROUP BY hull
+    ''')
+    # The server rebuilds its fleet snapshot whenever 'generation' changes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY, value INTEGER NOT NULL
+        )
+    ''')
+    # Validators from the last successful run, used for conditional GETs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT, fetched_at TEXT
+        )
+    ''')
+    # One summary row per run; the server exposes the latest one on /metrics
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, started_at TEXT NOT NULL, duration_seconds REAL NOT NULL,
+            outcome TEXT NOT NULL, ship_count INTEGER NOT NULL, stages TEXT NOT NULL, error TEXT
+        )
+    ''')
     conn.commit()
     conn.close()
-    print("Database initialized.")
+    logger.info("Database initialized.")
 
-def get_page_source_with_selenium(url, driver, wait_for_class=None):
-    print(f"Navigating to: {url}")
-    driver.get(url)
-    
-    # --- NEW INTERACTIVE STEP: HANDLE COOKIE BANNER ---
-    try:
-        # Wait up to 5 seconds for the cookie accept button to be clickable
-        cookie_button_wait = WebDriverWait(driver, 5)
-        # Using CSS_SELECTOR to find the button by its ID
-        cookie_button = cookie_button_wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "#gdpr-accept")))
-        print("Cookie consent banner found. Clicking 'Accept'...")
-        cookie_button.click()
-        # Give it a moment to disappear
-        time.sleep(2)
-    except Exception:
-        # If the button isn't there, no problem. Just continue.
-        print("No cookie consent banner found, or it was not clickable in time.")
-
-    if wait_for_class:
+def _migrate_ships_table(cursor):
+    """Copies rows from the old overwrite-in-place ships table into reports. The old table is left untouched."""
+    has_ships = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ships'").fetchone()
+    if not has_ships:
+        return
+    rows = cursor.execute("SELECT name, hull, class, status, locationReported FROM ships WHERE hull IS NOT NULL").fetchall()
+    migrated = []
+    for name, hull, ship_class, status, reported in rows:
+        report_date = parse_report_date(reported)
+        if report_date is None:
+            logger.warning("Not migrating %s: unreadable report date %r.", hull, reported)
+            continue
+        migrated.append((hull, report_date, name, ship_class, status, reported))
+    cursor.executemany("INSERT OR IGNORE INTO reports (hull, report_date, name, class, status, locationReported) VALUES (?, ?, ?, ?, ?, ?)",
+                       migrated)
+
+def _repair_report_dates(cursor):
+    """
+    Rewrites report dates stored as printed ('Sept. 2, 2024') by earlier versions as ISO dates,
+    deleting rows whose date can't be read, and recomputes the latest position of those hulls.
+    """
+    rows = cursor.execute("SELECT rowid, hull, report_date FROM reports "
+                          "WHERE report_date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'").fetchall()
+    if not rows:
+        return
+    for rowid, hull, report_date in rows:
+        iso_date = parse_report_date(report_date)
+        if iso_date is None:
+            logger.warning("Deleting report for %s with unreadable date %r.", hull, report_date)
+        else:
+            # An existing row for the same hull and day wins over the repaired one
+            cursor.execute("INSERT OR IGNORE INTO reports (hull, report_date, name, class, status, locationReported, source_url) "
+                           "SELECT hull, ?, name, class, status, locationReported, source_url FROM reports WHERE rowid = ?",
+                           (iso_date, rowid))
+        cursor.execute("DELETE FROM reports WHERE rowid = ?", (rowid,))
+    hulls = sorted({hull for _, hull, _ in rows})
+    cursor.executemany("DELETE FROM latest_positions WHERE hull = ?", [(hull,) for hull in hulls])
+    logger.info("Repaired report dates for %d hulls.", len(hulls))
+
+# --- RUN SUMMARY ---
+class ScrapeRun:
+    """
+    Collects per-stage timings for one run. Time spent in a stage more than once
+    (e.g. fetching the category page and then the post) is added up.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.outcome = 'error'
+        self.ship_count = 0
+        self.error = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
         try:
-            print(f"Waiting up to 30 seconds for element with class '{wait_for_class}' to appear...")
-            wait = WebDriverWait(driver, 30)
-            wait.until(EC.presence_of_element_located((By.CLASS_NAME, wait_for_class)))
-            print("Element found. Page is ready.")
-        except Exception as e:
-            print(f"Timeout occurred. The element '{wait_for_class}' did not appear within 30 seconds.")
-            return driver.page_source
-    else:
-        print("Waiting for page to load (5 seconds)...")
-        time.sleep(5)
-
-    print("Page source fetched.")
-    return driver.page_source
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
 
-def clean_status_text(text):
-    text = text.strip()
-    phrases_to_remove = [ r',\s*according to ship spotters\.?$', r',\s*according to local media reports\.?$' ]
-    for phrase in phrases_to_remove:
-        text = re.sub(phrase, '', text, flags=re.IGNORECASE)
-    text = text.strip()
-    if text and not text.endswith(('.', '!', '?')):
-        text += '.'
-    if text:
-        text = text[0].upper() + text[1:]
-    return text
+    def summary(self):
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': round(time.perf_counter() - self.started, 3),
+            'outcome': self.outcome,
+            'ship_count': self.ship_count,
+            'stages': {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            'error': self.error,
+        }
 
-def scrape_and_update():
-    print("Launching VISIBLE Chrome browser for debugging...")
+def record_run(run):
+    """Logs the run summary as one JSON line and stores it in scrape_runs."""
+    summary = run.summary()
+    logger.info("Scrape run summary: %s", json.dumps(summary))
+    try:
+        # A fresh connection, so a failure that broke the run's connection doesn't lose the summary
+        conn = connect_db()
+        with conn:
+            conn.execute("INSERT INTO scrape_runs (started_at, duration_seconds, outcome, ship_count, stages, error) VALUES (?, ?, ?, ?, ?, ?)",
+                         (summary['started_at'], summary['duration_seconds'], summary['outcome'], summary['ship_count'],
+                          json.dumps(summary['stages']), summary['error']))
+        conn.close()
+    except sqlite3.Error as e:
+        logger.error("Could not record the scrape run: %s", e)
+
+# --- FAST PATH: PLAIN HTTP WITH CONDITIONAL GET ---
+def create_http_session():
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+def fetch_page(session, conn, url):
+    """
+    Fetches a page with If-None-Match / If-Modified-Since from the last successful run.
+    Returns (html, validators); html is None when the server says, or the body shows,
+    that nothing changed. Validators are only saved by remember_page once the run succeeds,
+    so a failed run is retried in full next time.
+    """
+    row = conn.execute("SELECT etag, last_modified, content_hash FROM http_cache WHERE url = ?", (url,)).fetchone()
+    headers = {}
+    if row and row[0]:
+        headers['If-None-Match'] = row[0]
+    if row and row[1]:
+        headers['If-Modified-Since'] = row[1]
+
+    logger.info("Fetching: %s", url)
+    response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
+    if response.status_code == 304:
+        logger.info("Not modified since last run.")
+        return None, None
+    response.raise_for_status()
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'), content_hash)
+    if row and row[2] == content_hash:
+        logger.info("Content identical to last run.")
+        return None, validators
+    return response.text, validators
+
+def remember_page(conn, url, validators):
+    if not validators:
+        return
+    conn.execute("INSERT OR REPLACE INTO http_cache (url, etag, last_modified, content_hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                 (url, *validators, datetime.now().isoformat(timespec='seconds')))
+
+# --- SLOW PATH: SELENIUM, ONLY WHEN THE STATIC HTML IS MISSING WHAT WE NEED ---
+def start_browser():
+    logger.info("Launching VISIBLE Chrome browser for debugging...")
     chrome_options = Options()
     
     # --- MODIFICATION: The '--headless' argument is commented out so you can see the browser. ---
@@ -101,85 +242,162 @@ def scrape_and_update():
     
     chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
 
     service = ChromeService(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+def get_page_source_with_selenium(url, driver, wait_for_class=None, run=None):
+    run = run or ScrapeRun()
+    logger.info("Navigating to: %s", url)
+    with run.stage('page_fetch'):
+        driver.get(url)
+
+    # --- NEW INTERACTIVE STEP: HANDLE COOKIE BANNER ---
+    with run.stage('cookie_handling'):
+        try:
+            # Wait up to 5 seconds for the cookie accept button to be clickable
+            cookie_button_wait = WebDriverWait(driver, 5)
+            # Using CSS_SELECTOR to find the button by its ID
+            cookie_button = cookie_button_wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "#gdpr-accept")))
+            logger.info("Cookie consent banner found. Clicking 'Accept'...")
+            cookie_button.click()
+            # Wait for it to actually disappear rather than sleeping a fixed amount
+            WebDriverWait(driver, 5).until(EC.invisibility_of_element_located((By.CSS_SELECTOR, "#gdpr-accept")))
+        except Exception:
+            # If the button isn't there, no problem. Just continue.
+            logger.debug("No cookie consent banner found, or it was not clickable in time.")
+
+    with run.stage('page_fetch'):
+        if wait_for_class:
+            try:
+                logger.info("Waiting up to 30 seconds for element with class '%s' to appear...", wait_for_class)
+                wait = WebDriverWait(driver, 30)
+                wait.until(EC.presence_of_element_located((By.CLASS_NAME, wait_for_class)))
+                logger.info("Element found. Page is ready.")
+            except Exception:
+                logger.warning("Timeout occurred. The element '%s' did not appear within 30 seconds.", wait_for_class)
+                return driver.page_source
+        else:
+            logger.info("Waiting for page to finish loading...")
+            WebDriverWait(driver, 30).until(lambda d: d.execute_script("return document.readyState") == "complete")
+
+    logger.info("Page source fetched.")
+    return driver.page_source
+
+def write_reports(conn, ships, report_date, source_url, pages=()):
+    """
+    Loads the ships into a connection-private staging table, then merges them into reports,
+    bumps the generation and records the page validators in one transaction. Readers see
+    either the previous state or the complete new one, never a half-written refresh.
+    """
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS reports_staging (
+            hull TEXT NOT NULL, report_date TEXT NOT NULL, name TEXT NOT NULL, class TEXT,
+            status TEXT, locationReported TEXT, source_url TEXT
+        )
+    ''')
+    with conn:
+        conn.execute("DELETE FROM reports_staging")
+        conn.executemany("INSERT INTO reports_staging (hull, report_date, name, class, status, locationReported, source_url) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         [(ship['hull'], report_date, ship['name'], ship['class'], ship['status'], ship['locationReported'], source_url)
+                          for ship in ships])
+        # Re-scraping the same post replaces that day's rows; earlier reports are kept
+        conn.execute("INSERT OR REPLACE INTO reports (hull, report_date, name, class, status, locationReported, source_url) "
+                     "SELECT hull, report_date, name, class, status, locationReported, source_url FROM reports_staging")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                     "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+        for url, validators in pages:
+            remember_page(conn, url, validators)
+
+def scrape_and_update():
+    run = ScrapeRun()
+    session = create_http_session()
+    conn = connect_db()
+    driver = None
+
+    def get_browser():
+        nonlocal driver
+        if driver is None:
+            with run.stage('browser_startup'):
+                driver = start_browser()
+        return driver
 
     try:
-        html_content_category = get_page_source_with_selenium(USNI_CATEGORY_URL, driver)
+        with run.stage('page_fetch'):
+            html_content_category, category_validators = fetch_page(session, conn, USNI_CATEGORY_URL)
+        if html_content_category is None:
+            logger.info("Category page unchanged since last run. Nothing to do.")
+            run.outcome = 'unchanged'
+            return
+        if 'title56' not in html_content_category:
+            logger.info("Static category page has no article list. Falling back to the browser.")
+            html_content_category = get_page_source_with_selenium(USNI_CATEGORY_URL, get_browser(), wait_for_class='title56', run=run)
         if not html_content_category:
             raise Exception("Failed to get category page source.")
 
-        soup_category = BeautifulSoup(html_content_category, 'html.parser')
-        heading = soup_category.find('h3', class_='title56')
-        if not heading or not heading.find('a'):
+        with run.stage('parse'):
+            post_urls = parse_latest_post_urls(html_content_category, PARSER_BACKEND)
+        if not post_urls:
             raise Exception("Could not find latest article link.")
 
-        latest_url = heading.find('a')['href']
-        print(f"Found latest post URL: {latest_url}")
+        latest_url = post_urls[0]
+        logger.info("Found latest post URL: %s", latest_url)
 
-        # Let's try waiting for 'entry-content' as an alternative, since 'td-post-content' is failing
-        html_content_post = get_page_source_with_selenium(latest_url, driver, wait_for_class='entry-content')
+        with run.stage('page_fetch'):
+            html_content_post, post_validators = fetch_page(session, conn, latest_url)
+        if html_content_post is None:
+            logger.info("Latest post unchanged since last run. Nothing to do.")
+            remember_page(conn, USNI_CATEGORY_URL, category_validators)
+            conn.commit()
+            run.outcome = 'unchanged'
+            return
+        if 'entry-content' not in html_content_post and 'td-post-content' not in html_content_post:
+            logger.info("Static post page has no content div. Falling back to the browser.")
+            # Let's try waiting for 'entry-content' as an alternative, since 'td-post-content' is failing
+            html_content_post = get_page_source_with_selenium(latest_url, get_browser(), wait_for_class='entry-content', run=run)
         if not html_content_post:
             raise Exception("Failed to get post page source.")
 
-        soup_post = BeautifulSoup(html_content_post, 'html.parser')
-        
-        # We are trying to find 'entry-content' first.
-        post_content = soup_post.find('div', class_='entry-content')
-
-        if not post_content:
-            # If that fails, let's try our original idea as a fallback
-            post_content = soup_post.find('div', class_='td-post-content')
-
-        if not post_content:
+        with run.stage('parse'):
+            # The latest post is current, so an undated one is taken to be from today
+            update_date, report_date, ships = parse_dated_post(html_content_post, PARSER_BACKEND,
+                                                               default_date=datetime.now().strftime("%B %d, %Y"))
+        if ships is None:
             with open("debug_page.html", "w", encoding="utf-8") as f:
                 f.write(html_content_post)
-            print("DEBUGGING: Saved the page content to 'debug_page.html'.")
+            logger.debug("DEBUGGING: Saved the page content to 'debug_page.html'.")
             raise Exception("Could not find a valid content div ('entry-content' or 'td-post-content').")
-
-        date_tag = soup_post.find('time', class_='entry-date')
-        update_date = date_tag.text.strip() if date_tag else datetime.now().strftime("%B %d, %Y")
-        print(f"Found fleet data from: {update_date}")
-
-        ships = []
-        for p in post_content.find_all('p'):
-            text = p.get_text()
-            matches = re.finditer(r'(USS|HMS|JS|FS|HMAS)\s+([\w\s\'-]+?)\s+\(([\w\s-]+)\)', text)
-            for match in matches:
-                prefix, name, hull = match.groups()
-                raw_status = text[match.end():].strip().replace('•', '').strip()
-                if len(raw_status) > 10:
-                    ships.append({
-                        'name': f"{prefix} {name.strip()}",
-                        'hull': hull.strip(),
-                        'class': get_class_from_hull(hull.strip()),
-                        'status': clean_status_text(raw_status),
-                        'locationReported': update_date
-                    })
+        if report_date is None:
+            # Storing the printed date would sort after every ISO date and pin these rows as the latest
+            raise Exception(f"Could not read the post date {update_date!r}.")
+        logger.info("Found fleet data from: %s", update_date)
 
         if not ships:
-            print("No ships parsed. Text format may have changed or no ships listed in the usual format.")
+            logger.warning("No ships parsed. Text format may have changed or no ships listed in the usual format.")
+            run.outcome = 'no_ships'
             return
 
-        print(f"Successfully scraped {len(ships)} ships. Updating database...")
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM ships")
-        for ship in ships:
-            cursor.execute("INSERT INTO ships (name, hull, class, status, locationReported) VALUES (?, ?, ?, ?, ?)",
-                           (ship['name'], ship['hull'], ship['class'], ship['status'], ship['locationReported']))
-        conn.commit()
-        conn.close()
-        print("Database update complete.")
+        logger.info("Successfully scraped %d ships. Updating database...", len(ships))
+        with run.stage('db_write'):
+            write_reports(conn, ships, report_date, latest_url,
+                          [(USNI_CATEGORY_URL, category_validators), (latest_url, post_validators)])
+        run.outcome = 'updated'
+        run.ship_count = len(ships)
+        logger.info("Database update complete.")
 
     except Exception as e:
-        print(f"An unexpected error occurred during scraping: {e}")
+        run.error = str(e)
+        logger.exception("An unexpected error occurred during scraping: %s", e)
     finally:
-        driver.quit()
-        print("Browser closed.")
+        conn.close()
+        session.close()
+        if driver is not None:
+            driver.quit()
+            logger.info("Browser closed.")
+        record_run(run)
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     init_db()
-    scrape_and_update()
\ No newline at end of file
+    scrape_and_update()
@@ -1,19 +1,98 @@
 # server.py (v12 - Resilient Geocoding)
 
 import sqlite3
-from flask import Flask, jsonify, send_from_directory
+import json
+import logging
+import math
+import os
+import gzip
+import hashlib
+import threading
+import time
+import queue
+from contextlib import contextmanager
+from collections import OrderedDict
+from functools import lru_cache
+from flask import Flask, Response, abort, g, request, send_from_directory
 from datetime import datetime
 from flask_cors import CORS
 import re
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
+from geocache import GeocodeCache
+try:
+    import brotli
+except ImportError:
+    brotli = None
+import gazetteer
+import image_derivatives
+import metrics
+import spatial
 
-DATABASE_FILE = 'fleet.db'
+DATABASE_FILE = os.environ.get('FLEET_DATABASE', 'fleet.db')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+# Snapshots remembered per worker for /api/fleet?since=; older versions get a full resync
+DELTA_HISTORY_SIZE = 16
+# Fields that change between scrapes. Everything else is static and lives in /api/ships/static.
+DYNAMIC_FIELDS = ('status', 'class', 'coordinates', 'locationReported')
+# Idle read-only connections kept per worker process
+READ_POOL_SIZE = 4
+# How often the background refresher checks whether the scraper has written a new generation
+SNAPSHOT_REFRESH_SECONDS = 30
+# Where geocoding requests go; benchmarks point these at bench/fake_geocoder.py
+NOMINATIM_DOMAIN = os.environ.get('NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org')
+NOMINATIM_SCHEME = os.environ.get('NOMINATIM_SCHEME', 'https')
+# Upper bound on /api/fleet/nearest?k=
+NEAREST_MAX_K = 50
+# Directory shared by the gunicorn workers for /metrics; unset means each process reports only itself
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# --- INSTRUMENTATION ---
+# Kept per worker. With METRICS_DIR set, every worker writes its values there and /metrics sums them,
+# so a scrape sees the whole server regardless of which worker answers.
+STAGE_SECONDS = metrics.Histogram('fleet_server_stage_seconds', "Time spent in each server stage.", ['stage'])
+REQUEST_SECONDS = metrics.Histogram('fleet_server_request_seconds', "Request latency by endpoint.", ['endpoint'])
+GEOCODE_LOOKUPS = metrics.Counter('fleet_geocode_lookups_total', "Location lookups by how they were answered.", ['result'])
+NOMINATIM_CALLS = metrics.Counter('fleet_nominatim_calls_total', "Requests sent to Nominatim.", ['outcome'])
+SNAPSHOT_BUILDS = metrics.Counter('fleet_snapshot_builds_total', "Fleet snapshots built.")
+SCRAPER_LAST_RUN = metrics.Gauge('fleet_scraper_last_run', "Summary of the most recent scraper run, read from scrape_runs.", ['field'])
+SCRAPER_LAST_RUN_STAGE_SECONDS = metrics.Gauge('fleet_scraper_last_run_stage_seconds', "Time spent in each stage of the most recent scraper run.", ['stage'])
 
 # Initialize the geocoder
-geolocator = Nominatim(user_agent="fleet_tracker_app/1.0")
+geolocator = Nominatim(user_agent="fleet_tracker_app/1.0", domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME)
 geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
 
+# Every query goes through the persistent cache so repeat statuses never hit Nominatim
+geocode_cache = GeocodeCache(DATABASE_FILE)
+
+def geocode_query(query, allow_network=True):
+    """
+    Geocodes a single query through the cache. Returns [lon, lat] or None.
+    With allow_network=False only cached answers are used and Nominatim is never called.
+    """
+    cached, coords = geocode_cache.get(query)
+    if cached:
+        GEOCODE_LOOKUPS.inc(result='cache_hit')
+        return coords
+    GEOCODE_LOOKUPS.inc(result='cache_miss')
+    if not allow_network:
+        return None
+
+    # Errors propagate without being cached, so a network blip isn't remembered as 'place not found'
+    try:
+        with STAGE_SECONDS.time(stage='nominatim'):
+            location = geocode(query, timeout=10)
+    except Exception:
+        NOMINATIM_CALLS.inc(outcome='error')
+        raise
+    coords = [location.longitude, location.latitude] if location else None
+    NOMINATIM_CALLS.inc(outcome='found' if coords else 'not_found')
+    geocode_cache.put(query, coords)
+    return coords
+
 # This hardcoded data is now primarily for static info and a fallback for coordinates
 FALLBACK_FLEET_DATA = {
     "lastUpdated": "2025-06-29",
@@ -51,17 +130,51 @@ FALLBACK_FLEET_DATA = {
 app = Flask(__name__)
 CORS(app)
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE_FILE)
+# --- READ-ONLY CONNECTION POOL ---
+# Connections are opened lazily, so each gunicorn worker builds its own pool after the fork.
+# Keeping them open also keeps sqlite3's per-connection statement cache warm, so the queries
+# below are prepared once per connection rather than on every request.
+_read_pool = queue.LifoQueue()
+
+def _open_read_connection():
+    conn = sqlite3.connect(f"file:{DATABASE_FILE}?mode=ro", uri=True, check_same_thread=False, timeout=5)
     conn.row_factory = sqlite3.Row
     return conn
 
+@contextmanager
+def read_connection():
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = _open_read_connection()
+    try:
+        yield conn
+    except BaseException:
+        # Whatever went wrong inside the block, don't hand a connection in an unknown state to the next request
+        conn.close()
+        raise
+    if _read_pool.qsize() < READ_POOL_SIZE:
+        _read_pool.put(conn)
+    else:
+        conn.close()
+
 # --- FINAL, ROBUST GEOCODING FUNCTION ---
-def get_coords_from_status(status_text):
+def get_coords_from_status(status_text, allow_network=True):
     """
     Tries to extract a known location from status text and return coordinates.
-    This version uses a flexible regex and a two-step query process for reliability.
+    Known seas and naval ports are resolved offline through the gazetteer; only
+    statuses it doesn't recognize fall through to the regex and Nominatim.
+    History queries pass allow_network=False so they never wait on Nominatim.
     """
+    with STAGE_SECONDS.time(stage='geocode'):
+        return _resolve_status(status_text, allow_network)
+
+def _resolve_status(status_text, allow_network):
+    coords = gazetteer.lookup(status_text)
+    if coords:
+        GEOCODE_LOOKUPS.inc(result='gazetteer')
+        return coords
+
     # This single, flexible pattern finds a keyword and the location text that follows.
     # It stops at a period, the end of the line, or ", according" to avoid grabbing extra text.
     match = re.search(
@@ -71,7 +184,7 @@ def get_coords_from_status(status_text):
     )
 
     if not match:
-        print(f"DEBUG: No location pattern matched in status: '{status_text}'")
+        logger.debug("No location pattern matched in status: %r", status_text)
         return None
 
     keyword = match.group(1).lower()
@@ -87,75 +200,433 @@ def get_coords_from_status(status_text):
         primary_query = f"Port of {location_name}"
     
     try:
-        print(f"Attempting to geocode with primary query: '{primary_query}'")
-        location = geocode(primary_query, timeout=10)
+        logger.debug("Attempting to geocode with primary query: %r", primary_query)
+        coords = geocode_query(primary_query, allow_network)
 
         # If the primary query fails AND it was a port search, try again with just the location name.
-        if not location and primary_query.startswith("Port of"):
+        if not coords and primary_query.startswith("Port of"):
             fallback_query = location_name
-            print(f"Primary query failed. Trying fallback: '{fallback_query}'")
-            location = geocode(fallback_query, timeout=10)
+            logger.debug("Primary query failed. Trying fallback: %r", fallback_query)
+            coords = geocode_query(fallback_query, allow_network)
 
-        if location:
-            print(f"SUCCESS: Geocoded query to: ({location.latitude}, {location.longitude})")
-            return [location.longitude, location.latitude]
+        if coords:
+            logger.debug("Geocoded query to: (%s, %s)", coords[1], coords[0])
+            return coords
         else:
-            print(f"FAILED: All geocoding attempts for status '{status_text}' returned no result.")
+            logger.info("All geocoding attempts for status %r returned no result.", status_text)
             return None
     except Exception as e:
-        print(f"ERROR: Geocoding for query '{primary_query}' failed with an error: {e}")
+        logger.warning("Geocoding for query %r failed with an error: %s", primary_query, e)
         return None
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if METRICS_DIR:
+        metrics.start_flusher(METRICS_DIR)
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unknown')
+    return response
+
 @app.route('/')
 def serve_index():
     return send_from_directory('.', 'index.html')
 
+@app.route('/images/d/<name>')
+def serve_image_derivative(name):
+    # Rendered lazily if the cache was cleared since the snapshot handed out this URL
+    if not image_derivatives.ensure_derivative(name):
+        abort(404)
+    # Names are content-hashed, so a given URL never changes. send_from_directory adds the ETag and Range support.
+    response = send_from_directory(image_derivatives.DERIVATIVES_DIR, name, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/images/<path:filename>')
 def serve_images(filename):
     return send_from_directory('images', filename)
 
+def read_generation(conn):
+    """Returns the data generation the scraper last wrote, or 0 if it has never run."""
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+# Latest report per hull, and the fleet as it stood on a past date. Both are index seeks on
+# reports' (hull, report_date) key, so they stay fast as the history grows. CROSS JOIN pins the
+# join order so SQLite drives from the small latest_positions table instead of scanning reports.
+LATEST_POSITIONS_SQL = "SELECT name, hull, class, status, locationReported FROM latest_positions"
+AS_OF_SQL = """
+    SELECT r.name, r.hull, r.class, r.status, r.locationReported FROM latest_positions l
+    CROSS JOIN reports r ON r.hull = l.hull AND r.report_date = (
+        SELECT report_date FROM reports WHERE hull = l.hull AND report_date <= ?
+        ORDER BY report_date DESC LIMIT 1
+    )
+"""
+TRACK_SQL = "SELECT name, report_date, status, locationReported FROM reports WHERE hull = ? ORDER BY report_date"
+
+def merge_fleet_data(scraped_ships_rows, last_updated, allow_network=True, historical=False):
+    """
+    Merges scraped rows into the static fleet data and resolves coordinates.
+    With historical=True (as_of queries) only ships with a report are kept, and a status that
+    can't be resolved leaves coordinates empty instead of falling back to today's static position.
+    """
+    scraped_map = {ship['hull']: ship for ship in scraped_ships_rows}
+    master_data_copy = {
+        "lastUpdated": last_updated,
+        "ships": [dict(ship) for ship in FALLBACK_FLEET_DATA['ships']
+                  if not historical or ship['hull'] in scraped_map]
+    }
+
+    for ship in master_data_copy['ships']:
+        if ship['hull'] in scraped_map:
+            scraped_info = scraped_map[ship['hull']]
+            ship['status'] = scraped_info['status']
+            ship['locationReported'] = scraped_info['locationReported']
+            ship['class'] = scraped_info['class']
+            
+            logger.debug("Processing ship: %s", ship['name'])
+            new_coords = get_coords_from_status(ship['status'], allow_network)
+            if new_coords or historical:
+                ship['coordinates'] = new_coords
+            else:
+                logger.debug("Geocoding failed for status: %r. Using static coordinates.", ship['status'])
+    
+    logger.info("Built %d live records merged with static details.", len(scraped_map))
+    return master_data_copy
+
+def build_fleet_data():
+    """
+    Builds the current fleet from the latest position of every hull.
+    Database errors propagate so refresh_snapshot can keep serving the previous snapshot.
+    """
+    with STAGE_SECONDS.time(stage='db_read'), read_connection() as conn:
+        scraped_ships_rows = conn.execute(LATEST_POSITIONS_SQL).fetchall()
+
+    if not scraped_ships_rows:
+        logger.warning("Database has no reports yet. Serving fallback data.")
+        return FALLBACK_FLEET_DATA
+
+    with STAGE_SECONDS.time(stage='merge'):
+        return merge_fleet_data(scraped_ships_rows, datetime.now().strftime("%Y-%m-%d"))
+
+# --- MATERIALIZED FLEET SNAPSHOT ---
+# The merged fleet is built once per data generation and served as pre-serialized bytes,
+# so request latency never depends on the merge or on geocoding.
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_refresher_started = False
+
+def with_image_derivatives(data):
+    """Points each ship's image at its resized popup derivative and adds a thumbnail URL."""
+    return {
+        **data,
+        "ships": [{**ship, **image_derivatives.image_fields(ship.get('image'))} for ship in data['ships']]
+    }
+
+def compress_variants(body):
+    """Pre-compresses a response body once so requests only pick the right bytes."""
+    variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+def encoded_response(variants, etag, cache_control='no-cache'):
+    """Serves the best pre-compressed variant for the client's Accept-Encoding, with a per-encoding ETag."""
+    preference = [encoding for encoding in ('br', 'gzip', 'identity') if encoding in variants]
+    encoding = request.accept_encodings.best_match(preference, default='identity')
+    response = Response(variants[encoding], mimetype='application/json')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    response.set_etag(etag if encoding == 'identity' else f"{etag}-{encoding}")
+    return response.make_conditional(request)
+
+def serialize(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def json_error(message, status=400):
+    return Response(json.dumps({"error": message}), status=status, mimetype='application/json')
+
+def build_snapshot(generation, fleet_data=None):
+    SNAPSHOT_BUILDS.inc()
+    # Read before the build, so derivatives finishing mid-build still trigger another one
+    images_generation = image_derivatives.render_generation()
+    data = with_image_derivatives(fleet_data or build_fleet_data())
+    data = {**data, "version": generation}
+    with STAGE_SECONDS.time(stage='serialize'):
+        body = serialize(data)
+        static_body = serialize({
+            "ships": [{key: value for key, value in ship.items() if key not in DYNAMIC_FIELDS} for ship in data['ships']]
+        })
+        variants = compress_variants(body)
+        static_variants = compress_variants(static_body)
+    with STAGE_SECONDS.time(stage='spatial_index'):
+        index = spatial.GridIndex(data['ships'])
+    return {
+        "generation": generation,
+        "last_updated": data['lastUpdated'],
+        "ships": data['ships'],
+        "index": index,
+        "dynamic": {ship['hull']: {field: ship.get(field) for field in DYNAMIC_FIELDS} for ship in data['ships']},
+        "body": body,
+        "variants": variants,
+        "etag": f"{generation}-{hashlib.sha1(body).hexdigest()[:16]}",
+        "static_variants": static_variants,
+        "static_etag": f"static-{hashlib.sha1(static_body).hexdigest()[:16]}",
+        "stale": False,
+        "images_generation": images_generation,
+    }
+
+# --- DELTA SYNC ---
+# Each worker remembers the dynamic fields of its last few snapshots so a client that sends
+# ?since=<version> only downloads what changed. Versions are data generations, which come from
+# the database, so they mean the same thing in every worker.
+_snapshot_history = OrderedDict()
+_delta_cache = {}
+
+def remember_snapshot(snapshot):
+    _snapshot_history[snapshot['generation']] = snapshot['dynamic']
+    _snapshot_history.move_to_end(snapshot['generation'])
+    while len(_snapshot_history) > DELTA_HISTORY_SIZE:
+        _snapshot_history.popitem(last=False)
+    _delta_cache.clear()
+
+def build_delta(since, snapshot):
+    current = snapshot['dynamic']
+    previous = _snapshot_history.get(since)
+    if previous is None:
+        # Unknown or expired version: send every ship's dynamic fields
+        changed = list(current)
+        removed = []
+    else:
+        changed = [hull for hull, fields in current.items() if previous.get(hull) != fields]
+        removed = [hull for hull in previous if hull not in current]
+    return serialize({
+        "version": snapshot['generation'],
+        "full": previous is None,
+        "changed": [{"hull": hull, **current[hull]} for hull in changed],
+        "removed": removed,
+    })
+
+def get_delta_variants(since, snapshot):
+    # Every unknown version gets the same full resync, so they share one cache entry
+    if since not in _snapshot_history:
+        since = None
+    key = (since, snapshot['generation'])
+    variants = _delta_cache.get(key)
+    if variants is None:
+        variants = compress_variants(build_delta(since, snapshot))
+        _delta_cache[key] = variants
+    return variants
+
+def refresh_snapshot():
+    """
+    Rebuilds the snapshot if the scraper has written a new generation since the last build,
+    or if image derivatives that were missing from it have finished rendering.
+    """
+    global _snapshot
+    with _snapshot_lock:
+        try:
+            with read_connection() as conn:
+                generation = read_generation(conn)
+        except sqlite3.Error as e:
+            logger.warning("Could not read data generation: %s", e)
+            generation = _snapshot['generation'] if _snapshot else 0
+
+        if (_snapshot is None or _snapshot['stale'] or generation != _snapshot['generation']
+                or image_derivatives.render_generation() != _snapshot['images_generation']):
+            logger.info("Building fleet snapshot for generation %s...", generation)
+            try:
+                with STAGE_SECONDS.time(stage='snapshot_build'):
+                    snapshot = build_snapshot(generation)
+            except Exception as e:
+                if _snapshot is not None:
+                    # Keep the last good data; its generation is unchanged, so the next poll retries
+                    logger.error("Snapshot rebuild failed, still serving generation %s: %s", _snapshot['generation'], e)
+                    return _snapshot
+                logger.error("Could not build the fleet snapshot: %s. Serving fallback data until the next poll.", e)
+                snapshot = {**build_snapshot(generation, FALLBACK_FLEET_DATA), "stale": True}
+            _snapshot = snapshot
+            if not snapshot['stale']:
+                remember_snapshot(snapshot)
+        return _snapshot
+
+def _refresh_loop():
+    while True:
+        time.sleep(SNAPSHOT_REFRESH_SECONDS)
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            logger.exception("Background snapshot refresh failed: %s", e)
+
+def start_snapshot_refresher():
+    global _refresher_started
+    with _snapshot_lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    threading.Thread(target=_refresh_loop, name="snapshot-refresher", daemon=True).start()
+
+def get_snapshot():
+    snapshot = _snapshot
+    if snapshot is None:
+        snapshot = refresh_snapshot()
+        start_snapshot_refresher()
+    return snapshot
+
+@lru_cache(maxsize=64)
+def build_fleet_as_of(as_of, generation):
+    """Serialized fleet as of a past date. Cached per generation since history only changes when the scraper writes."""
+    with read_connection() as conn:
+        rows = conn.execute(AS_OF_SQL, (as_of,)).fetchall()
+    data = with_image_derivatives(merge_fleet_data(rows, as_of, allow_network=False, historical=True))
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
 @app.route('/api/fleet')
 def get_fleet_data():
+    snapshot = get_snapshot()
+    as_of = request.args.get('as_of')
+    if as_of:
+        try:
+            as_of = datetime.strptime(as_of, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            return json_error("as_of must be a date in YYYY-MM-DD format")
+        try:
+            body = build_fleet_as_of(as_of, snapshot['generation'])
+        except sqlite3.Error as e:
+            logger.warning("Could not read fleet history as of %s: %s", as_of, e)
+            return json_error("fleet history is unavailable", 503)
+        return Response(body, mimetype='application/json')
+
+    bbox = request.args.get('bbox')
+    if bbox:
+        try:
+            bbox = spatial.parse_bbox(bbox)
+        except ValueError as e:
+            return json_error(str(e))
+        response = Response(serialize({
+            "lastUpdated": snapshot['last_updated'],
+            "version": snapshot['generation'],
+            "ships": snapshot['index'].within(*bbox),
+        }), mimetype='application/json')
+        response.headers['X-Fleet-Generation'] = str(snapshot['generation'])
+        return response
+
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return json_error("since must be a version number")
+        response = encoded_response(get_delta_variants(since, snapshot), f"{snapshot['etag']}-since-{since}")
+    else:
+        response = encoded_response(snapshot['variants'], snapshot['etag'])
+    response.headers['X-Fleet-Generation'] = str(snapshot['generation'])
+    return response
+
+@app.route('/api/fleet/nearest')
+def get_nearest_ships():
+    snapshot = get_snapshot()
     try:
-        conn = get_db_connection()
-        scraped_ships_rows = conn.execute("SELECT name, hull, class, status, locationReported FROM ships").fetchall()
-        conn.close()
+        lon = float(request.args['lon'])
+        lat = float(request.args['lat'])
+        k = int(request.args.get('k', 5))
+    except (KeyError, ValueError):
+        return json_error("lon and lat are required numbers, k an optional integer")
+    if not math.isfinite(lon) or not (-90 <= lat <= 90) or not (1 <= k <= NEAREST_MAX_K):
+        return json_error(f"lat must be within -90..90 and k within 1..{NEAREST_MAX_K}")
 
-        if not scraped_ships_rows:
-            print("Database is empty or could not be read. Serving fallback data.")
-            return jsonify(FALLBACK_FLEET_DATA)
-
-        master_data_copy = {
-            "lastUpdated": datetime.now().strftime("%Y-%m-%d"),
-            "ships": [dict(ship) for ship in FALLBACK_FLEET_DATA['ships']]
-        }
-        
-        scraped_map = {ship['hull']: ship for ship in scraped_ships_rows}
-
-        for ship in master_data_copy['ships']:
-            if ship['hull'] in scraped_map:
-                scraped_info = scraped_map[ship['hull']]
-                ship['status'] = scraped_info['status']
-                ship['locationReported'] = scraped_info['locationReported']
-                ship['class'] = scraped_info['class']
-                
-                print(f"\nProcessing ship: {ship['name']}")
-                new_coords = get_coords_from_status(ship['status'])
-                if new_coords:
-                    ship['coordinates'] = new_coords
-                else:
-                    print(f"Geocoding failed for status: \"{ship['status']}\". Using static coordinates.")
-        
-        print(f"\nServing {len(scraped_map)} live records merged with static details.")
-        return jsonify(master_data_copy)
+    nearest = snapshot['index'].nearest(lon, lat, k)
+    return Response(serialize({
+        "version": snapshot['generation'],
+        "ships": [{**ship, "distanceKm": round(distance, 1)} for distance, ship in nearest],
+    }), mimetype='application/json')
 
-    except Exception as e:
-        print(f"Error connecting to database or processing data: {e}")
-        print("Serving fallback data due to error.")
-        return jsonify(FALLBACK_FLEET_DATA)
+@app.route('/api/fleet/clusters')
+def get_ship_clusters():
+    snapshot = get_snapshot()
+    try:
+        zoom = int(request.args.get('zoom', 0))
+    except ValueError:
+        return json_error("zoom must be an integer")
+    try:
+        bbox = spatial.parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+    except ValueError as e:
+        return json_error(str(e))
+    by = request.args.get('by') or None
+    if not (0 <= zoom <= spatial.MAX_CLUSTER_ZOOM) or (by and by not in spatial.CLUSTER_KEYS):
+        return json_error(f"zoom must be within 0..{spatial.MAX_CLUSTER_ZOOM} and by one of {', '.join(spatial.CLUSTER_KEYS)}")
+
+    return Response(serialize({
+        "version": snapshot['generation'],
+        "zoom": zoom,
+        "by": by,
+        "clusters": snapshot['index'].clusters(zoom, by, bbox),
+    }), mimetype='application/json')
+
+@app.route('/api/ships/static')
+def get_static_ship_data():
+    snapshot = get_snapshot()
+    # Only changes when the bundled fleet data or the images change, so let clients reuse it for a while
+    return encoded_response(snapshot['static_variants'], snapshot['static_etag'], 'public, max-age=3600')
+
+@app.route('/api/ships/<hull>/track')
+def get_ship_track(hull):
+    try:
+        with read_connection() as conn:
+            rows = conn.execute(TRACK_SQL, (hull,)).fetchall()
+    except sqlite3.Error as e:
+        logger.warning("Could not read the track of %s: %s", hull, e)
+        return json_error("ship tracks are unavailable", 503)
+    if not rows:
+        return json_error("no reports for this hull", 404)
+
+    # Statuses repeat week to week, so each distinct one is resolved once
+    resolved = {}
+    track = []
+    for row in rows:
+        status = row['status'] or ''
+        if status not in resolved:
+            resolved[status] = get_coords_from_status(status, allow_network=False)
+        track.append({
+            "date": row['report_date'],
+            "status": row['status'],
+            "locationReported": row['locationReported'],
+            "coordinates": resolved[status],
+        })
+    body = json.dumps({"hull": hull, "name": rows[-1]['name'], "track": track}, separators=(',', ':'))
+    return Response(body, mimetype='application/json')
+
+def update_scraper_gauges():
+    """Copies the latest scraper run summary into gauges; the scraper is a separate process Prometheus can't reach."""
+    try:
+        with read_connection() as conn:
+            row = conn.execute("SELECT started_at, duration_seconds, outcome, ship_count, stages FROM scrape_runs ORDER BY id DESC LIMIT 1").fetchone()
+    except sqlite3.Error:
+        return
+    if not row:
+        return
+    SCRAPER_LAST_RUN.set(datetime.fromisoformat(row['started_at']).timestamp(), field='started_timestamp_seconds')
+    SCRAPER_LAST_RUN.set(row['duration_seconds'], field='duration_seconds')
+    SCRAPER_LAST_RUN.set(row['ship_count'], field='ships')
+    SCRAPER_LAST_RUN.set(1 if row['outcome'] in ('updated', 'unchanged') else 0, field='success')
+    for stage, seconds in json.loads(row['stages']).items():
+        SCRAPER_LAST_RUN_STAGE_SECONDS.set(seconds, stage=stage)
 
+@app.route('/metrics')
+def get_metrics():
+    update_scraper_gauges()
+    return Response(metrics.render(METRICS_DIR), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    print("Starting Flask server...")
-    print("Your app will be available at http://127.0.0.1:5000/")
+    logger.info("Starting Flask server...")
+    logger.info("Your app will be available at http://127.0.0.1:5000/")
     app.run(debug=True, port=5000)
\ No newline at end of file
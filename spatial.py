@@ -0,0 +1,169 @@
+# spatial.py - Grid index over ship positions for viewport, nearest-ship and clustering queries
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+# Cell size of the index grid. 5 degrees gives 72 x 36 cells, so a viewport only touches a
+# handful of them while each cell still holds few enough ships to check one by one.
+CELL_DEGREES = 5.0
+# Clusters are formed on a square pixel grid of this size at the requested map zoom
+CLUSTER_CELL_PIXELS = 60
+MAX_CLUSTER_ZOOM = 22
+TILE_SIZE = 256
+# Web Mercator stops here; ships further north or south are drawn at the edge
+MAX_MERCATOR_LAT = 85.0511287798
+CLUSTER_KEYS = ('group', 'class')
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in kilometres between two [lon, lat] points."""
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def wrap_longitude(lon):
+    """Brings a longitude from a wrapped map copy (e.g. 190) back into [-180, 180]."""
+    if -180 <= lon <= 180:
+        return lon
+    return (lon + 180) % 360 - 180
+
+
+def parse_bbox(value):
+    """
+    Parses 'minLon,minLat,maxLon,maxLat'. Returns the four floats with longitudes wrapped,
+    so a box crossing the antimeridian comes back with min_lon > max_lon.
+    Raises ValueError for anything else.
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("bbox must be minLon,minLat,maxLon,maxLat") from None
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise ValueError("bbox values must be finite numbers")
+    if not (-90 <= min_lat <= max_lat <= 90):
+        raise ValueError("bbox latitudes must be within -90..90 with minLat <= maxLat")
+    if max_lon - min_lon >= 360:
+        return -180.0, min_lat, 180.0, max_lat
+    return wrap_longitude(min_lon), min_lat, wrap_longitude(max_lon), max_lat
+
+
+def _lon_ranges(min_lon, max_lon):
+    # A box whose west edge is east of its east edge wraps across the antimeridian
+    if min_lon <= max_lon:
+        return [(min_lon, max_lon)]
+    return [(min_lon, 180.0), (-180.0, max_lon)]
+
+
+def _mercator_pixels(lon, lat, zoom):
+    """World pixel coordinates of a point at the given zoom, as Mapbox and other web maps use them."""
+    scale = TILE_SIZE * 2 ** zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = (lon + 180) / 360 * scale
+    sin_lat = math.sin(math.radians(lat))
+    y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return x, y
+
+
+class GridIndex:
+    """
+    Fixed lat/lon grid over the ships that have coordinates. Built once per snapshot and never
+    modified afterwards, so request threads can query it without locking.
+    """
+
+    def __init__(self, ships, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.columns = int(math.ceil(360 / cell_degrees))
+        self.rows = int(math.ceil(180 / cell_degrees))
+        self.cells = {}
+        self._cluster_cache = {}
+        for ship in ships:
+            coords = ship.get('coordinates')
+            if not coords:
+                continue
+            lon, lat = wrap_longitude(coords[0]), coords[1]
+            self.cells.setdefault(self._cell(lon, lat), []).append((lon, lat, ship))
+
+    def _column(self, lon):
+        return min(self.columns - 1, max(0, int((lon + 180) // self.cell_degrees)))
+
+    def _row(self, lat):
+        return min(self.rows - 1, max(0, int((lat + 90) // self.cell_degrees)))
+
+    def _cell(self, lon, lat):
+        return self._column(lon), self._row(lat)
+
+    def __len__(self):
+        return sum(len(points) for points in self.cells.values())
+
+    def within(self, min_lon, min_lat, max_lon, max_lat):
+        """Ships inside the box, in index order. min_lon > max_lon means the box crosses the antimeridian."""
+        found = []
+        for west, east in _lon_ranges(min_lon, max_lon):
+            for column in range(self._column(west), self._column(east) + 1):
+                for row in range(self._row(min_lat), self._row(max_lat) + 1):
+                    for lon, lat, ship in self.cells.get((column, row), ()):
+                        if west <= lon <= east and min_lat <= lat <= max_lat:
+                            found.append(ship)
+        return found
+
+    def nearest(self, lon, lat, k):
+        """
+        The k ships closest to a point by great-circle distance, as (distance_km, ship) pairs.
+        Searches latitude bands outward from the point's row and stops once no unvisited band
+        can hold anything closer; a band spans every longitude, so the antimeridian needs no
+        special case.
+        """
+        lon = wrap_longitude(lon)
+        row = self._row(lat)
+        candidates = []
+        for offset in range(self.rows):
+            if len(candidates) >= k:
+                # Anything in a band this far away is at least this far north or south of the point
+                gap_degrees = (offset - 1) * self.cell_degrees
+                if math.radians(gap_degrees) * EARTH_RADIUS_KM > candidates[k - 1][0]:
+                    break
+            band_rows = {r for r in (row - offset, row + offset) if 0 <= r < self.rows}
+            if not band_rows:
+                break
+            for band_row in band_rows:
+                for column in range(self.columns):
+                    for point_lon, point_lat, ship in self.cells.get((column, band_row), ()):
+                        candidates.append((haversine_km(lon, lat, point_lon, point_lat), ship))
+            candidates.sort(key=lambda pair: pair[0])
+        return candidates[:k]
+
+    def clusters(self, zoom, by=None, bbox=None):
+        """
+        Groups ships that would overlap on screen at the given zoom. With by='group' or 'class',
+        ships only cluster with others that share that field. Whole-world results are cached
+        per (zoom, by) for the lifetime of the index.
+        """
+        key = (zoom, by)
+        if bbox is None and key in self._cluster_cache:
+            return self._cluster_cache[key]
+
+        points = (self.within(*bbox) if bbox is not None
+                  else [ship for cell in self.cells.values() for _, _, ship in cell])
+        buckets = {}
+        for ship in points:
+            lon, lat = wrap_longitude(ship['coordinates'][0]), ship['coordinates'][1]
+            x, y = _mercator_pixels(lon, lat, zoom)
+            bucket_key = (int(x // CLUSTER_CELL_PIXELS), int(y // CLUSTER_CELL_PIXELS), ship.get(by) if by else None)
+            buckets.setdefault(bucket_key, []).append((lon, lat, ship))
+
+        result = []
+        for (_, _, value), members in sorted(buckets.items(), key=lambda item: (-len(item[1]), item[0][:2])):
+            cluster = {
+                "coordinates": [round(sum(m[0] for m in members) / len(members), 4),
+                                round(sum(m[1] for m in members) / len(members), 4)],
+                "count": len(members),
+                "hulls": [m[2]['hull'] for m in members],
+            }
+            if by:
+                cluster[by] = value
+            result.append(cluster)
+
+        if bbox is None:
+            self._cluster_cache[key] = result
+        return result
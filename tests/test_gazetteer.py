@@ -0,0 +1,49 @@
+# test_gazetteer.py - Offline lookups for statuses as USNI actually writes them
+#
+# Usage: python -m pytest tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gazetteer
+
+
+def place(name):
+    for names, coords in gazetteer.PLACES:
+        if name in names:
+            return coords
+    raise KeyError(name)
+
+
+@pytest.mark.parametrize('status, expected', [
+    ("Is pierside at Naval Station Mayport, Fla. following a seven-month deployment.", "Mayport"),
+    ("Is in port at Naval Base Guam after operating in the Philippine Sea.", "Guam"),
+    ("Is moored at Naval Air Station North Island.", "North Island"),
+    ("Is in port at Fleet Activities Yokosuka, Japan.", "Yokosuka"),
+    ("Is pierside at Joint Expeditionary Base Little Creek.", "Little Creek"),
+    ("Is pierside at Naval Station Norfolk, Va.", "Norfolk"),
+    ("Is conducting flight operations off Southern California, according to local media reports.",
+     "Southern California"),
+    ("Are operating in the Med.", "Mediterranean"),
+    ("Is operating in the Eastern Mediterranean.", "Eastern Mediterranean"),
+    ("Arrived in Rota, Spain after operating in the Eastern Mediterranean.", "Rota"),
+    ("Is in port in Naples, Italy.", "Naples, Italy"),
+    ("Is operating in the Red Sea.", "Red Sea"),
+    ("Is in the Gulf of Aden escorting merchant traffic.", "Gulf of Aden"),
+])
+def test_lookup_finds_the_place_the_ship_is(status, expected):
+    assert gazetteer.lookup(status) == place(expected)
+
+
+@pytest.mark.parametrize('status', [
+    # Somewhere the table doesn't know; Nominatim should get it rather than Souda Bay
+    "Arrived off the Horn of Africa after a port visit to Souda Bay, Greece.",
+    "Is pierside at Naval Station Nowhere, Fla.",
+    "Is in port in Naples, Fla.",
+    "And USS Wayne E. Meyer (DDG-108).",
+])
+def test_lookup_leaves_unknown_places_to_the_geocoder(status):
+    assert gazetteer.lookup(status) is None
@@ -0,0 +1,213 @@
+# usni_parser.py - Extracts ships from USNI fleet tracker pages
+
+import re
+from datetime import date, datetime
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# 'html.parser' goes through BeautifulSoup; 'lxml' walks an lxml tree directly, skipping the
+# BeautifulSoup object model, which is where most of the parse time goes.
+BACKENDS = ('html.parser', 'lxml')
+DEFAULT_BACKEND = 'html.parser'
+
+HULL_TO_CLASS = {
+    'CVN': 'Aircraft Carrier', 'LHA': 'Amphibious Assault Ship', 'LHD': 'Amphibious Assault Ship',
+    'LPD': 'Amphibious Transport Dock', 'LSD': 'Dock Landing Ship', 'CG': 'Cruiser',
+    'DDG': 'Destroyer', 'LCS': 'Littoral Combat Ship', 'SSN': 'Submarine',
+    'SSBN': 'Submarine', 'SSGN': 'Submarine', 'ESB': 'Expeditionary Sea Base',
+    'LCC': 'Command Ship', 'T-AO': 'Replenishment Oiler', 'R': 'Aircraft Carrier',
+    'DDH': 'Helicopter Destroyer'
+}
+
+# --- PRECOMPILED PATTERNS ---
+SHIP_PATTERN = re.compile(r'(USS|HMS|JS|FS|HMAS)\s+([\w\s\'-]+?)\s+\(([\w\s-]+)\)')
+HULL_PREFIX_PATTERN = re.compile(r'([A-Z]+)')
+# Post dates as printed, e.g. 'June 30, 2025', 'Sept. 2, 2024' or 'Dec 1, 2023'
+REPORT_DATE_FORMATS = ('%B %d, %Y', '%b %d, %Y')
+MONTH_ABBREVIATION_PATTERN = re.compile(r'^(Sept|[A-Za-z]{3,})\.?(?=\s)')
+STATUS_SUFFIX_PATTERNS = [
+    re.compile(r',\s*according to ship spotters\.?$', re.IGNORECASE),
+    re.compile(r',\s*according to local media reports\.?$', re.IGNORECASE),
+]
+
+if lxml is not None:
+    # Same matching as BeautifulSoup's class_=..., which checks one entry of the class list
+    _CLASS_TEST = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+    LXML_CONTENT_XPATH = lxml.etree.XPath(f"//div[{_CLASS_TEST.format('entry-content')}]")
+    LXML_LEGACY_CONTENT_XPATH = lxml.etree.XPath(f"//div[{_CLASS_TEST.format('td-post-content')}]")
+    LXML_DATE_XPATH = lxml.etree.XPath(f"//time[{_CLASS_TEST.format('entry-date')}]")
+
+
+def get_class_from_hull(hull):
+    match = HULL_PREFIX_PATTERN.match(hull)
+    if match:
+        prefix = match.group(1)
+        return HULL_TO_CLASS.get(prefix, 'Unknown')
+    return 'Unknown'
+
+
+def clean_status_text(text):
+    text = text.strip()
+    for pattern in STATUS_SUFFIX_PATTERNS:
+        text = pattern.sub('', text)
+    text = text.strip()
+    if text and not text.endswith(('.', '!', '?')):
+        text += '.'
+    if text:
+        text = text[0].upper() + text[1:]
+    return text
+
+
+def parse_report_date(update_date, datetime_attr=None):
+    """
+    Returns the post date as an ISO date ('2025-06-30'), which is what reports are keyed and
+    sorted by. Prefers the <time datetime="..."> attribute and falls back to the printed date.
+    Returns None if neither can be read.
+    """
+    if datetime_attr:
+        try:
+            return date.fromisoformat(datetime_attr.strip()[:10]).isoformat()
+        except ValueError:
+            pass
+    if not update_date:
+        return None
+    # 'Sept.' -> 'Sep', 'Dec.' -> 'Dec', so strptime's %b accepts them
+    text = MONTH_ABBREVIATION_PATTERN.sub(lambda m: m.group(1)[:3] if m.group(1) == 'Sept' else m.group(1),
+                                          ' '.join(update_date.split()))
+    for date_format in REPORT_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def tokenize_paragraph(text):
+    """
+    Splits a paragraph at ship boundaries in a single pass over the matches.
+    Yields (prefix, name, hull, raw_status, end), where raw_status runs from the end of the
+    ship's name to the start of the next ship, so each status is sliced exactly once, and
+    end is the offset where the ship's name ends.
+    """
+    previous = None
+    for match in SHIP_PATTERN.finditer(text):
+        if previous is not None:
+            yield (*previous.groups(), text[previous.end():match.start()], previous.end())
+        previous = match
+    if previous is not None:
+        yield (*previous.groups(), text[previous.end():], previous.end())
+
+
+def _clean_raw_status(raw_status):
+    return raw_status.strip().replace('•', '').strip()
+
+
+def _ship(prefix, name, hull, status, update_date):
+    hull = hull.strip()
+    return {
+        'name': f"{prefix} {name.strip()}",
+        'hull': hull,
+        'class': get_class_from_hull(hull),
+        'status': clean_status_text(status),
+        'locationReported': update_date
+    }
+
+
+def parse_ships(text, update_date):
+    """
+    Returns the ships mentioned in one paragraph of post text.
+    A ship whose own fragment is only a connector, as in "USS A (DDG-1) and USS B (DDG-2) are
+    operating...", shares the status of the next ship that has one. Ships left without one at
+    the end of the paragraph keep the rest of the paragraph, as the original parser did.
+    """
+    ships = []
+    waiting = []
+    for prefix, name, hull, raw_status, end in tokenize_paragraph(text):
+        raw_status = _clean_raw_status(raw_status)
+        if len(raw_status) > 10:
+            ships.extend(_ship(*ship[:3], raw_status, update_date) for ship in waiting)
+            waiting = []
+            ships.append(_ship(prefix, name, hull, raw_status, update_date))
+        else:
+            waiting.append((prefix, name, hull, end))
+    for prefix, name, hull, end in waiting:
+        rest = _clean_raw_status(text[end:])
+        if len(rest) > 10:
+            ships.append(_ship(prefix, name, hull, rest, update_date))
+    return ships
+
+
+def parse_latest_post_urls(html_content_category, backend=DEFAULT_BACKEND):
+    """Returns the post URLs listed on a category (archive) page, newest first."""
+    soup_category = BeautifulSoup(html_content_category, backend)
+    return [heading.find('a')['href'] for heading in soup_category.find_all('h3', class_='title56') if heading.find('a')]
+
+
+def parse_post(html_content_post, backend=DEFAULT_BACKEND, default_date=None):
+    """
+    Extracts the ships from a fleet tracker post.
+    Returns (update_date, ships), or (None, None) if the page has no recognizable content div.
+    A post without a date tag gets default_date, which is None unless the caller knows the
+    post is current (the live scraper); archived posts must never be dated today.
+    """
+    update_date, _, ships = parse_dated_post(html_content_post, backend, default_date)
+    return update_date, ships
+
+
+def parse_dated_post(html_content_post, backend=DEFAULT_BACKEND, default_date=None):
+    """
+    Like parse_post, but returns (update_date, report_date, ships), where report_date is the
+    ISO date from parse_report_date, or None if the post's date can't be read.
+    """
+    if backend == 'lxml':
+        return _parse_post_lxml(html_content_post, default_date)
+    soup_post = BeautifulSoup(html_content_post, backend)
+
+    # 'entry-content' is the current layout, 'td-post-content' the older one
+    post_content = soup_post.find('div', class_='entry-content') or soup_post.find('div', class_='td-post-content')
+    if not post_content:
+        return None, None, None
+
+    date_tag = soup_post.find('time', class_='entry-date')
+    if date_tag:
+        update_date = date_tag.text.strip()
+        report_date = parse_report_date(update_date, date_tag.get('datetime'))
+    else:
+        update_date = default_date
+        report_date = parse_report_date(default_date)
+
+    ships = []
+    for p in post_content.find_all('p'):
+        ships.extend(parse_ships(p.get_text(), update_date))
+    return update_date, report_date, ships
+
+
+def _parse_post_lxml(html_content_post, default_date):
+    if lxml is None:
+        raise RuntimeError("The 'lxml' parser backend requires the lxml package.")
+    try:
+        root = lxml.html.document_fromstring(html_content_post)
+    except lxml.etree.ParserError:
+        return None, None, None
+
+    content = LXML_CONTENT_XPATH(root) or LXML_LEGACY_CONTENT_XPATH(root)
+    if not content:
+        return None, None, None
+
+    date_tags = LXML_DATE_XPATH(root)
+    if date_tags:
+        update_date = date_tags[0].text_content().strip()
+        report_date = parse_report_date(update_date, date_tags[0].get('datetime'))
+    else:
+        update_date = default_date
+        report_date = parse_report_date(default_date)
+
+    ships = []
+    for p in content[0].iter('p'):
+        ships.extend(parse_ships(p.text_content(), update_date))
+    return update_date, report_date, ships